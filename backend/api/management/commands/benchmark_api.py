@@ -0,0 +1,222 @@
+import json
+import statistics
+import time
+from contextlib import nullcontext
+from unittest import mock
+from urllib.parse import quote
+
+from api.v1.queries import QueryRecorder, get_query_budget
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from recipes.models import Ingredient, Recipe, RecipeQuerySet
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+def percentile(values, share):
+    """Возвращает перцентиль share (от 0 до 1) отсортированных values."""
+    index = min(len(values) - 1, round(share * (len(values) - 1)))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время ответа и число запросов к базе данных основных "
+        "эндпоинтов API через тестовый клиент Django. Результат можно "
+        "сохранить как эталон и сравнивать с ним последующие замеры. "
+        "Команда завершается ошибкой, если эндпоинт превышает бюджет "
+        "запросов вьюсета или повторяет один запрос (N+1). Поиск рецептов "
+        "замеряется и через PostgreSQL (если база данных - PostgreSQL), и "
+        "через запасной поиск на стороне Python."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--user",
+            help="Имя пользователя для авторизованных запросов. По умолчанию "
+            "выбирается пользователь с наибольшим числом подписок.",
+        )
+        parser.add_argument(
+            "--save-baseline", metavar="PATH", help="Сохранить результат."
+        )
+        parser.add_argument(
+            "--baseline", metavar="PATH", help="Сравнить с эталоном."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Допустимое относительное ухудшение медианы времени.",
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        anonymous = APIClient()
+        client = APIClient()
+        client.force_authenticate(user)
+
+        results = {}
+        problems = []
+        endpoints = self.get_endpoints(anonymous, client)
+        for name, api_client, url, context in endpoints:
+            with context():
+                results[name] = self.measure(api_client, url, options)
+            self.stdout.write(self.format_result(name, results[name]))
+            problems.extend(
+                f"{name}: {problem}"
+                for problem in results[name].pop("problems")
+            )
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(
+                f"Эталон сохранён в {options['save_baseline']}"
+            )
+
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+            regressions = self.compare(
+                results, baseline, options["tolerance"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Ухудшение по сравнению с эталоном:\n"
+                    + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("Ухудшений не найдено."))
+
+        if problems:
+            raise CommandError(
+                "Лишние запросы к базе данных:\n" + "\n".join(problems)
+            )
+
+    @staticmethod
+    def get_user(username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = (
+                User.objects.annotate(follows=Count("follower"))
+                .order_by("-follows", "id")
+                .first()
+            )
+        if user is None:
+            raise CommandError("Пользователь для замеров не найден.")
+        return user
+
+    @staticmethod
+    def get_endpoints(anonymous, client):
+        recipe = Recipe.objects.order_by("-favorites_count", "-id").first()
+        ingredient = Ingredient.objects.order_by("id").first()
+        if recipe is None or ingredient is None:
+            raise CommandError(
+                "Нет данных для замеров, создайте их командой generate_data."
+            )
+        prefix = ingredient.name[:2]
+        search = f"/api/recipes/?search={quote(recipe.name.split()[0])}"
+        endpoints = (
+            ("recipes_list_anonymous", anonymous, "/api/recipes/"),
+            ("recipes_list", client, "/api/recipes/"),
+            ("recipes_list_cursor", client, "/api/recipes/?cursor="),
+            ("recipe_detail", client, f"/api/recipes/{recipe.id}/"),
+            ("recipes_feed", client, "/api/recipes/feed/"),
+            ("recipes_trending", client, "/api/recipes/trending/"),
+            (
+                "subscriptions",
+                client,
+                "/api/users/subscriptions/?recipes_limit=3",
+            ),
+            (
+                "download_shopping_cart",
+                client,
+                "/api/recipes/download_shopping_cart/",
+            ),
+            (
+                "ingredients_search",
+                anonymous,
+                f"/api/ingredients/?name={prefix}",
+            ),
+        )
+        endpoints = [(*endpoint, nullcontext) for endpoint in endpoints]
+        if connection.vendor == "postgresql":
+            endpoints.append(
+                ("recipes_search_postgresql", client, search, nullcontext)
+            )
+        # Запасной поиск используется для остальных СУБД, а на PostgreSQL
+        # включается подменой типа базы данных в RecipeQuerySet.
+        endpoints.append(
+            (
+                "recipes_search_python",
+                client,
+                search,
+                lambda: mock.patch.object(
+                    RecipeQuerySet, "db_vendor", "python"
+                ),
+            )
+        )
+        return endpoints
+
+    @staticmethod
+    def measure(client, url, options):
+        for _ in range(options["warmup"]):
+            client.get(url)
+
+        timings = []
+        queries = 0
+        problems = []
+        for _ in range(options["repeat"]):
+            with QueryRecorder() as recorder:
+                started = time.perf_counter()
+                response = client.get(url)
+                if getattr(response, "streaming", False):
+                    b"".join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f"{url}: ответ {response.status_code}")
+            if len(recorder) > queries:
+                queries = len(recorder)
+                problems = recorder.check(get_query_budget(response))
+
+        timings.sort()
+        return {
+            "p50": statistics.median(timings),
+            "p90": percentile(timings, 0.9),
+            "p99": percentile(timings, 0.99),
+            "max": timings[-1],
+            "queries": queries,
+            "problems": problems,
+        }
+
+    @staticmethod
+    def format_result(name, result):
+        return (
+            f"{name}: p50 {result['p50']:.1f} мс, p90 {result['p90']:.1f} мс, "
+            f"p99 {result['p99']:.1f} мс, max {result['max']:.1f} мс, "
+            f"запросов {result['queries']}"
+        )
+
+    @staticmethod
+    def compare(results, baseline, tolerance):
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{name}: запросов {result['queries']} "
+                    f"вместо {expected['queries']}"
+                )
+            if result["p50"] > expected["p50"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: медиана {result['p50']:.1f} мс "
+                    f"вместо {expected['p50']:.1f} мс"
+                )
+        return regressions
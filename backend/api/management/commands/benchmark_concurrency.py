@@ -0,0 +1,130 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import Ingredient, Recipe
+
+from .benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагружает запущенный сервер параллельными запросами к основным "
+        "эндпоинтам чтения и замеряет пропускную способность и задержки. "
+        "Результат замера одного развёртывания (например, gunicorn с WSGI) "
+        "можно сохранить и сравнить с ним другое (uvicorn с ASGI)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument(
+            "--token", help="Токен для авторизованных запросов."
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Адрес эндпоинта, например /api/recipes/. По умолчанию "
+            "замеряются список и страница рецепта, теги и автодополнение "
+            "ингредиентов.",
+        )
+        parser.add_argument(
+            "--save", metavar="PATH", help="Сохранить результат."
+        )
+        parser.add_argument(
+            "--compare", metavar="PATH", help="Сравнить с результатом."
+        )
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+
+        results = {}
+        for path in options["path"] or self.get_paths():
+            results[path] = self.run(
+                options["base_url"].rstrip("/") + path, headers, options
+            )
+            self.stdout.write(self.format_result(path, results[path]))
+
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f"Результат сохранён в {options['save']}")
+
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                self.compare(results, json.load(file))
+
+    @staticmethod
+    def get_paths():
+        recipe = Recipe.objects.order_by("-favorites_count", "-id").first()
+        ingredient = Ingredient.objects.order_by("id").first()
+        if recipe is None or ingredient is None:
+            raise CommandError(
+                "Нет данных для замеров, создайте их командой generate_data."
+            )
+        return (
+            "/api/recipes/",
+            f"/api/recipes/{recipe.id}/",
+            "/api/tags/",
+            f"/api/ingredients/?name={ingredient.name[:2]}",
+        )
+
+    @staticmethod
+    def run(url, headers, options):
+        local = threading.local()
+
+        def fetch(_):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+            started = time.perf_counter()
+            try:
+                response = local.session.get(
+                    url, headers=headers, timeout=options["timeout"]
+                )
+                failed = response.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            return (time.perf_counter() - started) * 1000, failed
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            samples = list(executor.map(fetch, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(timing for timing, _ in samples)
+        return {
+            "rps": len(samples) / elapsed,
+            "p50": statistics.median(timings),
+            "p90": percentile(timings, 0.9),
+            "p99": percentile(timings, 0.99),
+            "max": timings[-1],
+            "errors": sum(failed for _, failed in samples),
+        }
+
+    @staticmethod
+    def format_result(path, result):
+        return (
+            f"{path}: {result['rps']:.0f} запросов/с, "
+            f"p50 {result['p50']:.1f} мс, p90 {result['p90']:.1f} мс, "
+            f"p99 {result['p99']:.1f} мс, max {result['max']:.1f} мс, "
+            f"ошибок {result['errors']}"
+        )
+
+    def compare(self, results, other):
+        for path, result in results.items():
+            expected = other.get(path)
+            if expected is None:
+                continue
+            self.stdout.write(
+                f"{path}: пропускная способность "
+                f"x{result['rps'] / expected['rps']:.2f}, "
+                f"p99 {expected['p99']:.1f} -> {result['p99']:.1f} мс"
+            )
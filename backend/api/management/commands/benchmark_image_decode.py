@@ -0,0 +1,84 @@
+import base64
+import multiprocessing
+import os
+import resource
+import time
+from io import BytesIO
+
+from api.v1.fields import Base64ImageField
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from PIL import Image
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает прирост пиковой RSS процесса при декодировании большой "
+        "картинки в base64 целиком и полем Base64ImageField."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size-mb", type=int, default=20)
+
+    def handle(self, *args, **options):
+        payload = self.make_payload(options["size_mb"] * 1024 * 1024)
+        self.stdout.write(
+            f"Размер строки base64: {len(payload) / 2**20:.1f} МБ"
+        )
+
+        def decode_whole():
+            header, data = payload.split(";base64,")
+            return base64.b64decode(data)
+
+        def decode_field():
+            with override_settings(MAX_IMAGE_UPLOAD_SIZE=len(payload)):
+                return Base64ImageField().to_internal_value(payload)
+
+        for label, decode in (
+            ("целиком", decode_whole),
+            ("Base64ImageField", decode_field),
+        ):
+            peak, elapsed = self.measure(decode)
+            self.stdout.write(
+                f"{label}: прирост пиковой RSS {peak / 2**20:.1f} МБ, "
+                f"{elapsed * 1000:.0f} мс"
+            )
+
+    @staticmethod
+    def measure(decode):
+        """Выполняет decode в дочернем процессе.
+
+        Возвращает прирост пикового резидентного размера процесса
+        (ru_maxrss) в байтах и время выполнения в секундах. Отдельный
+        процесс нужен потому, что ru_maxrss не сбрасывается, а память,
+        освобождённая Python, не всегда возвращается системе.
+        """
+        def run(connection):
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            started = time.perf_counter()
+            decode()
+            elapsed = time.perf_counter() - started
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # В Linux ru_maxrss измеряется в килобайтах.
+            connection.send(((after - before) * 1024, elapsed))
+            connection.close()
+
+        context = multiprocessing.get_context("fork")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=run, args=(sender,))
+        process.start()
+        sender.close()
+        try:
+            return receiver.recv()
+        finally:
+            process.join()
+
+    @staticmethod
+    def make_payload(size):
+        buffer = BytesIO()
+        Image.new("RGB", (16, 16)).save(buffer, "PNG")
+        # Хвост из случайных байтов не мешает определить тип картинки
+        # по заголовку и доводит файл до нужного размера.
+        buffer.write(os.urandom(size))
+        encoded = base64.b64encode(buffer.getvalue()).decode()
+        return f"data:image/png;base64,{encoded}"
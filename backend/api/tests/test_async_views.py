@@ -0,0 +1,101 @@
+from api.v1.async_views import async_read, recipe_detail, recipe_list, tag_list
+from api.v1.views import RecipeViewSet, TagsViewSet
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+
+from .utils import (APITest, create_ingredients, create_recipe, create_tags,
+                    create_user)
+
+
+class AsyncReadViewsTest(APITest):
+    """Асинхронные обработчики отвечают так же, как вьюсеты DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("author")
+        tags = create_tags(2)
+        ingredients = create_ingredients(2)
+        cls.recipes = [
+            create_recipe(cls.user, f"Рецепт {number}", tags, ingredients)
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+
+    def get(self, view, sync_view, path, headers, **kwargs):
+        # AsyncRequestFactory передаёт именованные аргументы как
+        # заголовки ASGI, поэтому имена задаются без префикса HTTP_.
+        request = self.factory.get(path, **headers)
+        response = async_to_sync(async_read(view, sync_view))(
+            request, **kwargs
+        )
+        if hasattr(response, "render"):
+            # Ответ вьюсета DRF рендерит обработчик запросов Django.
+            response.render()
+        return response
+
+    def get_tags(self, **headers):
+        return self.get(
+            tag_list,
+            TagsViewSet.as_view({"get": "list"}),
+            "/api/tags/",
+            headers,
+        )
+
+    def get_recipe(self, recipe, **headers):
+        return self.get(
+            recipe_detail,
+            RecipeViewSet.as_view({"get": "retrieve"}),
+            f"/api/recipes/{recipe.id}/",
+            headers,
+            pk=str(recipe.id),
+        )
+
+    def get_recipes(self, **headers):
+        return self.get(
+            recipe_list,
+            RecipeViewSet.as_view({"get": "list"}),
+            "/api/recipes/",
+            headers,
+        )
+
+    def test_tags_match_sync_view(self):
+        expected = self.client.get("/api/tags/")
+        response = self.get_tags()
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, expected.json())
+        self.assertEqual(response["ETag"], expected["ETag"])
+        self.assertIn("Accept", response["Vary"])
+
+        response = self.get_tags(**{"If-None-Match": expected["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_detail_conditional(self):
+        recipe = self.recipes[0]
+        expected = self.client.get(f"/api/recipes/{recipe.id}/")
+        response = self.get_recipe(recipe)
+        self.assertJSONEqual(response.content, expected.json())
+        self.assertEqual(response["ETag"], expected["ETag"])
+        for header in ("Accept", "Authorization"):
+            self.assertIn(header, response["Vary"])
+
+        response = self.get_recipe(
+            recipe, **{"If-None-Match": expected["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_anonymous_cache_is_shared_with_sync_view(self):
+        response = self.get_recipes()
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            expected = self.client.get("/api/recipes/")
+        self.assertEqual(response.content, expected.content)
+
+    def test_indented_json_is_delegated(self):
+        accept = "application/json; indent=4"
+        response = self.get_recipes(Accept=accept)
+        expected = self.client.get("/api/recipes/", HTTP_ACCEPT=accept)
+        self.assertTrue(response.content.startswith(b'{\n    "count"'))
+        self.assertEqual(response.content, expected.content)
@@ -0,0 +1,80 @@
+from api.v1.authentication import _token_cache_key
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from .utils import APITest, create_user
+
+URL = "/api/users/me/"
+
+
+@override_settings(TOKEN_CACHE_TIMEOUT=60)
+class CachedTokenAuthenticationTest(APITest):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("user")
+        self.user.set_password("Qwerty123")
+        self.user.save()
+        self.authenticate(self.user)
+        self.key = Token.objects.get(user=self.user).key
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(URL).status_code, 200)
+        return len(context)
+
+    def test_user_is_cached(self):
+        first = self.count_queries()
+        self.assertIsNotNone(cache.get(_token_cache_key(self.key)))
+        self.assertEqual(self.count_queries(), first - 1)
+
+    def test_logout_invalidates_token(self):
+        self.client.get(URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+
+        self.assertIsNone(cache.get(_token_cache_key(self.key)))
+        self.assertEqual(self.client.get(URL).status_code, 401)
+
+    def test_set_password_invalidates_cached_user(self):
+        self.client.get(URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/users/set_password/",
+                {
+                    "current_password": "Qwerty123",
+                    "new_password": "Ytrewq321!",
+                },
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(cache.get(_token_cache_key(self.key)))
+
+        self.client.get(URL)
+        cached = cache.get(_token_cache_key(self.key))
+        self.assertTrue(cached.check_password("Ytrewq321!"))
+
+    def test_deactivation_invalidates_token(self):
+        self.client.get(URL)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertEqual(self.client.get(URL).status_code, 401)
+
+    def test_last_login_keeps_cache(self):
+        self.client.get(URL)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=("last_login",))
+        self.assertIsNotNone(cache.get(_token_cache_key(self.key)))
+
+
+class TokenAuthenticationWithoutCacheTest(APITest):
+    def test_process_cache_is_not_used(self):
+        user = create_user("user")
+        self.authenticate(user)
+        self.assertEqual(self.client.get(URL).status_code, 200)
+        key = Token.objects.get(user=user).key
+        self.assertIsNone(cache.get(_token_cache_key(key)))
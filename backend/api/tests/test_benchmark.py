@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from recipes.models import Follow, Recipe, RecipeIngredient
+
+from .utils import APITest
+
+User = get_user_model()
+
+
+class BenchmarkCommandsTest(APITest):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "generate_data",
+            users=20,
+            recipes=50,
+            ingredients=30,
+            follows_per_user=3,
+            favorites_per_user=3,
+            carts_per_user=2,
+            stdout=StringIO(),
+        )
+
+    def benchmark(self, *args):
+        stdout = StringIO()
+        call_command(
+            "benchmark_api", "--repeat=2", "--warmup=0", *args, stdout=stdout
+        )
+        return stdout.getvalue()
+
+    def test_generate_data(self):
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Recipe.objects.count(), 50)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(RecipeIngredient.objects.exists())
+        self.assertTrue(Recipe.objects.filter(favorites_count__gt=0).exists())
+
+    def test_benchmark_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            output = self.benchmark(f"--save-baseline={path}")
+            with open(path) as file:
+                baseline = json.load(file)
+
+            self.assertIn("recipes_list", baseline)
+            self.assertIn("recipes_search_python", baseline)
+            self.assertIn("recipes_list: p50", output)
+
+            self.assertIn(
+                "Ухудшений не найдено.",
+                self.benchmark(f"--baseline={path}", "--tolerance=1000"),
+            )
+
+            baseline["recipes_list"]["p50"] = 0
+            with open(path, "w") as file:
+                json.dump(baseline, file)
+            with self.assertRaisesMessage(CommandError, "recipes_list"):
+                self.benchmark(f"--baseline={path}")
+
+    def test_benchmark_without_data(self):
+        Recipe.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, "generate_data"):
+            self.benchmark()
@@ -0,0 +1,34 @@
+from api.v1.cache import get_versions
+
+from .utils import APITest, create_recipe, create_user
+
+
+class RecipeCacheVersionsTest(APITest):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("user")
+        self.recipe = create_recipe(create_user("author"), "Рецепт")
+
+    def test_favorite_does_not_bump_recipe_lists(self):
+        names = (
+            "recipes",
+            f"recipe:{self.recipe.id}",
+            f"user-state:{self.user.id}",
+        )
+        before = get_versions(*names)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.favorite.add(self.user)
+        after = get_versions(*names)
+
+        self.assertEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+        self.assertNotEqual(after[2], before[2])
+
+    def test_anonymous_list_shows_current_counters(self):
+        self.client.get("/api/recipes/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.favorite.add(self.user)
+            self.recipe.cart.add(self.user)
+        recipe = self.client.get("/api/recipes/").json()["results"][0]
+        self.assertEqual(recipe["favorites_count"], 1)
+        self.assertEqual(recipe["carts_count"], 1)
@@ -0,0 +1,42 @@
+from .utils import APITest, create_recipe, create_tags, create_user
+
+
+class ConditionalGetTest(APITest):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.recipe = create_recipe(
+            create_user("author"), "Рецепт", create_tags(2)
+        )
+
+    def test_not_modified(self):
+        for url in ("/api/tags/", f"/api/recipes/{self.recipe.id}/"):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response["ETag"]
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_media_type(self):
+        etag = self.client.get("/api/tags/")["ETag"]
+        response = self.client.get(
+            "/api/tags/", HTTP_ACCEPT="text/html", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("Accept", response["Vary"])
+
+    def test_recipe_etag_depends_on_user(self):
+        url = f"/api/recipes/{self.recipe.id}/"
+        response = self.client.get(url)
+        self.assertIn("Authorization", response["Vary"])
+        self.authenticate(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Authorization", response["Vary"])
+
+    def test_invalid_recipe_pk(self):
+        response = self.client.get("/api/recipes/abc/")
+        self.assertEqual(response.status_code, 404)
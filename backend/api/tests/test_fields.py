@@ -0,0 +1,62 @@
+import base64
+from unittest import mock
+
+from api.v1.fields import Base64ImageField
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, override_settings
+
+from .utils import image_data
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    def setUp(self):
+        self.field = Base64ImageField()
+
+    def assert_invalid(self, data):
+        with self.assertRaises(ValidationError) as context:
+            self.field.to_internal_value(data)
+        return context.exception
+
+    def test_valid_image(self):
+        data = image_data()
+        content = base64.b64decode(data.split(",", 1)[1])
+        file = self.field.to_internal_value(data)
+        self.assertTrue(file.name.endswith(".png"))
+        self.assertEqual(file.content_type, "image/png")
+        self.assertEqual(file.size, len(content))
+        self.assertEqual(file.read(), content)
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=10)
+    def test_oversize_rejected_before_decoding(self):
+        with mock.patch("api.v1.fields.base64.b64decode") as b64decode:
+            error = self.assert_invalid(image_data())
+        b64decode.assert_not_called()
+        self.assertIn("10 байт", error.messages[0])
+
+    def test_invalid_base64(self):
+        header, encoded = image_data().split(",", 1)
+        for payload in (
+            "!" + encoded[1:],
+            encoded[:8] + "=" + encoded[9:],
+            encoded[:-1],
+        ):
+            with self.subTest(payload=payload[-8:]):
+                self.assert_invalid(f"{header},{payload}")
+
+    def test_wrong_header(self):
+        encoded = image_data().split(",", 1)[1]
+        for data in (
+            encoded,
+            f"data:text/plain;base64,{encoded}",
+            f"data:image/png,{encoded}",
+            f"data:image/svg;base64,{encoded}",
+            f"data:image/jpeg;base64,{encoded}",
+            123,
+        ):
+            with self.subTest(data=str(data)[:24]):
+                self.assert_invalid(data)
+
+    def test_not_an_image(self):
+        encoded = base64.b64encode(b"not an image" * 10).decode()
+        error = self.assert_invalid(f"data:image/png;base64,{encoded}")
+        self.assertIn("не является изображением", error.messages[0])
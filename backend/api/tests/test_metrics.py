@@ -0,0 +1,62 @@
+from django.test import override_settings
+
+from .utils import APITest, create_user
+
+URL = "/api/metrics/"
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTest(APITest):
+    def get_metrics(self, authorization=None):
+        headers = {}
+        if authorization is not None:
+            headers["HTTP_AUTHORIZATION"] = authorization
+        return self.client.get(URL, **headers)
+
+    def test_token_is_required(self):
+        for authorization in (
+            None,
+            "",
+            "Bearer",
+            "Bearer wrong",
+            "Bearer secret2",
+            "Token secret",
+            "secret",
+        ):
+            with self.subTest(authorization=authorization):
+                response = self.get_metrics(authorization)
+                self.assertEqual(response.status_code, 404)
+
+    def test_valid_token(self):
+        self.client.get("/api/tags/")
+        response = self.get_metrics("Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+        self.assertIn("foodgram_request_duration_seconds_count", content)
+        self.assertIn('view="tag-list"', content)
+        self.assertIn('foodgram_response_cache_total{result="hit"}', content)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_empty_token_disables_token_access(self):
+        for authorization in ("Bearer ", "Bearer"):
+            with self.subTest(authorization=authorization):
+                response = self.get_metrics(authorization)
+                self.assertEqual(response.status_code, 404)
+
+    def test_staff_access(self):
+        user = create_user("user")
+        self.client.force_login(user)
+        self.assertEqual(self.get_metrics().status_code, 404)
+
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.get_metrics().status_code, 200)
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled_instrumentation(self):
+        self.assertEqual(self.get_metrics("Bearer secret").status_code, 404)
+
+    def test_server_timing_header(self):
+        response = self.client.get("/api/tags/")
+        self.assertIn("db;dur=", response["Server-Timing"])
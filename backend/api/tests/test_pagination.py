@@ -0,0 +1,84 @@
+from base64 import b64decode
+from urllib.parse import parse_qs, urlsplit
+
+from django.utils import timezone
+from recipes.models import Recipe
+
+from .utils import APITest, create_recipe, create_user
+
+
+class RecipeCursorPaginationTest(APITest):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user("author")
+        recipes = [
+            create_recipe(author, f"Рецепт {index}") for index in range(7)
+        ]
+        # Одинаковые значения первых полей сортировки.
+        Recipe.objects.update(pub_date=timezone.now())
+        for recipe in recipes[:4]:
+            Recipe.objects.filter(id=recipe.id).update(favorites_count=5)
+        cls.expected = list(
+            Recipe.objects.order_by("-pub_date", "-id").values_list(
+                "id", flat=True
+            )
+        )
+        cls.expected_popular = list(
+            Recipe.objects.order_by(
+                "-favorites_count", "-pub_date", "-id"
+            ).values_list("id", flat=True)
+        )
+
+    def walk(self, url, link):
+        """Проходит по страницам по ссылкам link.
+
+        Возвращает id рецептов страниц и адрес последней страницы.
+        """
+        pages = []
+        while True:
+            data = self.client.get(url).json()
+            pages.append([recipe["id"] for recipe in data["results"]])
+            if not data[link]:
+                return pages, url
+            cursor = parse_qs(urlsplit(data[link]).query)["cursor"][0]
+            self.assertNotIn("o", parse_qs(b64decode(cursor).decode()))
+            url = data[link]
+
+    def test_pages_without_offsets(self):
+        pages, last = self.walk("/api/recipes/?cursor=&limit=2", "next")
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual(len(pages), 4)
+
+        pages, _ = self.walk(last, "previous")
+        self.assertEqual(sum(reversed(pages), []), self.expected)
+
+    def test_popular_ordering_pages_without_offsets(self):
+        pages, last = self.walk(
+            "/api/recipes/?ordering=popular&cursor=&limit=2", "next"
+        )
+        self.assertEqual(sum(pages, []), self.expected_popular)
+        self.assertEqual(len(pages), 4)
+
+        pages, _ = self.walk(last, "previous")
+        self.assertEqual(sum(reversed(pages), []), self.expected_popular)
+
+    def test_page_number_mode_without_cursor(self):
+        data = self.client.get("/api/recipes/?limit=2&page=2").json()
+        self.assertEqual(data["count"], 7)
+        self.assertEqual(
+            [recipe["id"] for recipe in data["results"]], self.expected[2:4]
+        )
+
+    def test_invalid_cursor(self):
+        cursors = (
+            "cD1hYmM=",
+            "cD0lNUIlMjJ4JTIyJTVE",
+            "cD0lNUIlMjJ4JTIyJTJDJTIyeSUyMiUyQyUyMjElMjIlNUQ=",
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                for ordering in ("", "popular"):
+                    response = self.client.get(
+                        f"/api/recipes/?ordering={ordering}&cursor={cursor}"
+                    )
+                    self.assertEqual(response.status_code, 404)
@@ -0,0 +1,57 @@
+from api.v1.queries import QueryBudgetMixin
+from recipes.models import Follow
+
+from .utils import (APITest, create_ingredients, create_recipe, create_tags,
+                    create_user)
+
+
+class QueryBudgetTest(QueryBudgetMixin, APITest):
+    """Эндпоинты укладываются в бюджеты query_budgets вьюсетов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        tags = create_tags(3)
+        ingredients = create_ingredients(5)
+        cls.recipes = []
+        for index in range(4):
+            author = create_user(f"author{index}")
+            Follow.objects.create(user=cls.user, author=author)
+            for number in range(3):
+                recipe = create_recipe(
+                    author, f"Рецепт {index}-{number}", tags, ingredients
+                )
+                recipe.favorite.add(cls.user)
+                recipe.cart.add(cls.user)
+                cls.recipes.append(recipe)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_endpoints(self):
+        paths = (
+            "/api/recipes/",
+            "/api/recipes/?cursor=",
+            f"/api/recipes/{self.recipes[0].id}/",
+            "/api/recipes/feed/",
+            "/api/recipes/download_shopping_cart/",
+            "/api/users/subscriptions/",
+            "/api/tags/",
+            "/api/ingredients/",
+        )
+        for path in paths:
+            with self.subTest(path=path):
+                response = self.assert_query_budget("get", path)
+                self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_endpoints(self):
+        self.client.credentials()
+        for path in ("/api/recipes/", f"/api/recipes/{self.recipes[0].id}/"):
+            with self.subTest(path=path):
+                response = self.assert_query_budget("get", path)
+                self.assertEqual(response.status_code, 200)
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesMessage(AssertionError, "бюджет: 1"):
+            self.assert_query_budget("get", "/api/recipes/", budget=1)
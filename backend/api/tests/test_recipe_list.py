@@ -0,0 +1,61 @@
+from api.v1.serializers import RecipeSerializer
+from django.core.cache import cache
+from recipes.models import Recipe
+
+from .utils import (APITest, create_ingredients, create_recipe, create_tags,
+                    create_user)
+
+
+class RecipeListQueriesTest(APITest):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        tags = create_tags(3)
+        ingredients = create_ingredients(5)
+        authors = [create_user(f"author{index}") for index in range(5)]
+        for index in range(60):
+            recipe = create_recipe(
+                authors[index % len(authors)],
+                f"Рецепт {index}",
+                tags,
+                ingredients,
+            )
+            if index % 2:
+                recipe.favorite.add(cls.user)
+                recipe.cart.add(cls.user)
+
+    def assert_list_queries(self, expected):
+        for limit in (6, 50):
+            cache.clear()
+            with self.subTest(limit=limit), self.assertNumQueries(expected):
+                response = self.client.get(f"/api/recipes/?limit={limit}")
+            self.assertEqual(len(response.json()["results"]), limit)
+
+    def test_anonymous(self):
+        # Подсчёт, рецепты, теги, авторы и ингредиенты.
+        self.assert_list_queries(5)
+
+    def test_anonymous_cached(self):
+        self.client.get("/api/recipes/?limit=6")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/recipes/?limit=6")
+        self.assertIn("Accept", response["Vary"])
+
+        response = self.client.get(
+            "/api/recipes/?limit=6",
+            HTTP_ACCEPT="application/json; indent=4",
+        )
+        self.assertTrue(response.content.startswith(b'{\n    "count"'))
+
+    def test_authenticated(self):
+        self.client.force_authenticate(self.user)
+        self.assert_list_queries(5)
+
+    def test_prefetched_ingredients(self):
+        recipe = Recipe.objects.with_user_data(self.user).first()
+        serializer = RecipeSerializer()
+        with self.assertNumQueries(0):
+            prefetched = serializer.get_ingredients(recipe)
+        plain = Recipe.objects.get(pk=recipe.pk)
+        self.assertEqual(len(prefetched), 5)
+        self.assertEqual(prefetched, list(serializer.get_ingredients(plain)))
@@ -0,0 +1,97 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from recipes.models import Recipe
+
+from .utils import (APITest, create_ingredients, create_recipe, create_tags,
+                    create_user, image_data)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeWriteTest(APITest):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("author")
+        cls.tags = create_tags(10)
+        cls.ingredients = create_ingredients(10)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def get_data(self, count, amount=10):
+        return {
+            "name": f"Рецепт {count}",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": image_data(),
+            "tags": [tag.id for tag in self.tags[:count]],
+            "ingredients": [
+                {"id": ingredient.id, "amount": amount}
+                for ingredient in self.ingredients[:count]
+            ],
+        }
+
+    def test_create_query_count_does_not_depend_on_size(self):
+        for count in (1, 10):
+            with self.subTest(count=count), self.assertNumQueries(17):
+                response = self.client.post(
+                    "/api/recipes/", self.get_data(count), format="json"
+                )
+            self.assertEqual(response.status_code, 201, response.content)
+
+    def test_update_query_count_does_not_depend_on_size(self):
+        for count in (1, 10):
+            recipe = create_recipe(
+                self.user,
+                f"Старый рецепт {count}",
+                self.tags[:5],
+                self.ingredients[:5],
+            )
+            with self.subTest(count=count), self.assertNumQueries(18):
+                response = self.client.patch(
+                    f"/api/recipes/{recipe.id}/",
+                    self.get_data(count, amount=20),
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200, response.content)
+
+    def test_invalid_amount(self):
+        for amount in ("abc", None, 0, 40000, [1]):
+            with self.subTest(amount=amount):
+                response = self.client.post(
+                    "/api/recipes/",
+                    self.get_data(2, amount=amount),
+                    format="json",
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("ingredients", response.json())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_invalid_tags(self):
+        missing = max(tag.id for tag in self.tags) + 1
+        for tags in (["abc"], [None], [0], [[1]], "1", [missing]):
+            with self.subTest(tags=tags):
+                data = self.get_data(2)
+                data["tags"] = tags
+                response = self.client.post(
+                    "/api/recipes/", data, format="json"
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("tags", response.json())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_duplicate_tags(self):
+        data = self.get_data(2)
+        data["tags"] = [self.tags[0].id, str(self.tags[0].id)]
+        response = self.client.post("/api/recipes/", data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("tags", response.json())
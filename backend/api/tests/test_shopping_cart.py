@@ -0,0 +1,76 @@
+from .utils import (APITest, create_ingredients, create_recipe, create_tags,
+                    create_user)
+
+URL = "/api/recipes/download_shopping_cart/"
+
+
+class ShoppingCartDownloadTest(APITest):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("user")
+        author = create_user("author")
+        tags = create_tags(1)
+        ingredients = create_ingredients(3)
+        cls.recipes = [
+            create_recipe(author, "Рецепт 1", tags, ingredients[:2]),
+            create_recipe(author, "Рецепт 2", tags, ingredients[1:]),
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+        for recipe in self.recipes:
+            self.client.post(f"/api/recipes/{recipe.id}/shopping_cart/")
+
+    def download(self, **params):
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv_is_default(self):
+        response, content = self.download()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            response["Content-Disposition"], "attachment;filename=cart.csv"
+        )
+        self.assertEqual(
+            content.decode().splitlines(),
+            [
+                "name,unit,total_amount",
+                "Ингредиент 0,г,10",
+                "Ингредиент 1,г,20",
+                "Ингредиент 2,г,10",
+            ],
+        )
+
+    def test_txt(self):
+        response, content = self.download(format="txt")
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertEqual(
+            content.decode().splitlines(),
+            [
+                "Ингредиент 0 (г) — 10",
+                "Ингредиент 1 (г) — 20",
+                "Ингредиент 2 (г) — 10",
+            ],
+        )
+
+    def test_pdf(self):
+        response, content = self.download(format="pdf")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(content.startswith(b"%PDF"))
+        self.assertTrue(content.rstrip().endswith(b"%%EOF"))
+
+    def test_unknown_format(self):
+        response = self.client.get(URL, {"format": "xlsx"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("xlsx", response.json()["errors"])
+
+    def test_empty_cart(self):
+        self.authenticate(create_user("other"))
+        self.assertEqual(self.client.get(URL).status_code, 400)
+
+    def test_authentication_is_required(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(URL).status_code, 401)
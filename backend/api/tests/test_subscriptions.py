@@ -0,0 +1,52 @@
+from recipes.models import Follow
+
+from .utils import APITest, create_recipe, create_user
+
+
+class SubscriptionsTest(APITest):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        for index in range(3):
+            author = create_user(f"author{index}")
+            for number in range(index + 1):
+                create_recipe(author, f"Рецепт {index}-{number}")
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def get_recipe_counts(self, recipes_limit):
+        response = self.client.get(
+            "/api/users/subscriptions/",
+            {"recipes_limit": recipes_limit},
+        )
+        self.assertEqual(response.status_code, 200)
+        return [
+            (len(author["recipes"]), author["recipes_count"])
+            for author in response.json()["results"]
+        ]
+
+    def test_recipes_limit(self):
+        cases = {
+            "2": [(2, 3), (2, 2), (1, 1)],
+            "0": [(0, 3), (0, 2), (0, 1)],
+            "-1": [(0, 3), (0, 2), (0, 1)],
+            "abc": [(3, 3), (2, 2), (1, 1)],
+        }
+        for recipes_limit, expected in cases.items():
+            with self.subTest(recipes_limit=recipes_limit):
+                self.assertEqual(
+                    self.get_recipe_counts(recipes_limit), expected
+                )
+
+    def test_latest_recipes_first(self):
+        response = self.client.get(
+            "/api/users/subscriptions/", {"recipes_limit": 1}
+        )
+        names = [
+            author["recipes"][0]["name"]
+            for author in response.json()["results"]
+        ]
+        self.assertEqual(names, ["Рецепт 2-2", "Рецепт 1-1", "Рецепт 0-0"])
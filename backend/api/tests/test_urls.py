@@ -0,0 +1,45 @@
+import importlib
+
+from api.v1 import urls
+from api.v1.async_views import async_read, recipe_detail
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import clear_url_caches, resolve
+
+
+def reload_urls():
+    importlib.reload(urls)
+    clear_url_caches()
+
+
+@override_settings(ASYNC_READ_VIEWS=True)
+class AsyncReadUrlsTest(TestCase):
+    def setUp(self):
+        reload_urls()
+        self.addCleanup(reload_urls)
+
+    def test_list_actions_are_not_shadowed(self):
+        for action in ("feed", "trending", "download_shopping_cart"):
+            with self.subTest(action=action):
+                match = resolve(f"/recipes/{action}/", urlconf=urls)
+                self.assertEqual(match.func.actions, {"get": action})
+
+    def test_recipe_detail_is_async(self):
+        match = resolve("/recipes/1/", urlconf=urls)
+        self.assertEqual(match.url_name, "recipe-detail")
+        self.assertEqual(match.kwargs, {"pk": "1"})
+        self.assertFalse(hasattr(match.func, "actions"))
+
+    def test_invalid_pk_falls_back_to_sync_view(self):
+        calls = []
+
+        def sync_view(request, *args, **kwargs):
+            calls.append(kwargs)
+            return "sync"
+
+        request = RequestFactory().get("/api/recipes/abc/")
+        request.user = AnonymousUser()
+        view = async_read(recipe_detail, sync_view)
+        self.assertEqual(async_to_sync(view)(request, pk="abc"), "sync")
+        self.assertEqual(calls, [{"pk": "abc"}])
@@ -0,0 +1,73 @@
+import base64
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from PIL import Image
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        first_name=username,
+        last_name=username,
+        password="password",
+    )
+
+
+def create_recipe(author, name, tags=(), ingredients=(), **fields):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        image="recipes/images/test.jpg",
+        text="Описание",
+        cooking_time=10,
+        **fields,
+    )
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+        for ingredient in ingredients
+    )
+    return recipe
+
+
+def create_tags(count):
+    return [
+        Tag.objects.create(name=f"Тег {index}", slug=f"tag-{index}")
+        for index in range(count)
+    ]
+
+
+def create_ingredients(count):
+    return [
+        Ingredient.objects.create(
+            name=f"Ингредиент {index}", measurement_unit="г"
+        )
+        for index in range(count)
+    ]
+
+
+class APITest(APITestCase):
+    """Базовый класс тестов API с очисткой кэша."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def authenticate(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+
+def image_data(color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, "PNG")
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/png;base64,{encoded}"
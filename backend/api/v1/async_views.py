@@ -0,0 +1,248 @@
+"""Модуль содержит асинхронные обработчики часто запрашиваемых GET.
+
+Под ASGI-сервером обработчики списка и страницы рецептов, тегов и
+автодополнения ингредиентов не занимают поток на время ожидания базы
+данных и медленных клиентов. Ответы совпадают с ответами вьюсетов DRF:
+используются те же фильтры, сериализаторы, кэш ответов и условные GET.
+
+Запросы, которые асинхронная версия не обрабатывает (другие методы,
+курсоры, формат ответа кроме JSON, ошибки аутентификации, фильтров и
+пагинации), передаются вьюсету DRF через sync_to_async.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from recipes.autocomplete import ingredient_index
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import CachedTokenAuthentication
+from .cache import cache_response, get_cached_response, get_response_key
+from .conditional import async_condition, recipe_condition, versions_condition
+from .filters import RecipeFilter
+from .pagination import PageLimitPagination, RecipePagination
+from .serializers import IngredientSerializer, RecipeSerializer, TagSerializer
+
+CONTENT_TYPE = "application/json"
+
+
+class UnsupportedRequestError(Exception):
+    """Запрос должен быть обработан синхронным вьюсетом."""
+
+
+def _is_supported(request):
+    accept = request.headers.get("Accept", "")
+    return (
+        request.method == "GET"
+        and RecipePagination.cursor_query_param not in request.GET
+        and "format" not in request.GET
+        and "text/html" not in accept
+        and "indent=" not in accept
+    )
+
+
+async def _authenticate(request):
+    # Пользователь из сессии AuthenticationMiddleware загружается
+    # синхронно, а DRF всё равно использует только токены.
+    try:
+        result = await sync_to_async(
+            CachedTokenAuthentication().authenticate
+        )(request)
+    except AuthenticationFailed:
+        raise UnsupportedRequestError
+    request.user = result[0] if result else AnonymousUser()
+
+
+def async_read(async_view, sync_view):
+    """Обработчик, выполняющий async_view и при необходимости sync_view.
+
+    sync_view - обработчик вьюсета DRF для того же адреса. Ему передаются
+    и запросы, на которых async_view завершился ошибкой в данных запроса
+    (несуществующий объект, некорректный параметр).
+    """
+    delegate = sync_to_async(sync_view)
+
+    @wraps(async_view)
+    async def view(request, *args, **kwargs):
+        if _is_supported(request):
+            # Формат ответа тот же, что выбрал бы DRF, поэтому ETag и
+            # ключи кэша совпадают с ключами вьюсета.
+            request.accepted_media_type = CONTENT_TYPE
+            try:
+                await _authenticate(request)
+                return await async_view(request, *args, **kwargs)
+            except (
+                UnsupportedRequestError,
+                ObjectDoesNotExist,
+                ValidationError,
+                ValueError,
+            ):
+                # Ошибки в данных запроса, в том числе при вычислении
+                # ETag, обрабатывает вьюсет DRF.
+                pass
+        return await delegate(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
+
+
+def _render(data):
+    response = HttpResponse(
+        JSONRenderer().render(data), content_type=CONTENT_TYPE
+    )
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+async def _get_cached(request, basename, action, names, kwargs):
+    """Возвращает ключ кэша ответа анонимному пользователю и ответ."""
+    if request.user.is_authenticated:
+        return None, None
+    key = await sync_to_async(get_response_key)(
+        basename, action, names, kwargs, request.GET, CONTENT_TYPE
+    )
+    response = await sync_to_async(get_cached_response)(key, CONTENT_TYPE)
+    if response is not None:
+        patch_vary_headers(response, ("Accept",))
+    return key, response
+
+
+async def _render_cached(key, data):
+    response = _render(data)
+    if key is not None:
+        await sync_to_async(cache_response)(key, response.content)
+    return response
+
+
+def _filter_recipes(request, queryset):
+    filterset = RecipeFilter(request.GET, queryset=queryset, request=request)
+    if not filterset.is_valid():
+        raise UnsupportedRequestError
+    return filterset.qs
+
+
+def _get_page_size(request):
+    try:
+        page_size = int(
+            request.GET[PageLimitPagination.page_size_query_param]
+        )
+    except (KeyError, ValueError):
+        page_size = 0
+    if page_size > 0:
+        return page_size
+    return settings.REST_FRAMEWORK["PAGE_SIZE"]
+
+
+async def _paginate(request, queryset):
+    """Возвращает страницу queryset в формате PageLimitPagination."""
+    page_size = _get_page_size(request)
+    param = PageLimitPagination.page_query_param
+    try:
+        number = int(request.GET.get(param, 1))
+    except ValueError:
+        raise UnsupportedRequestError
+    count = await queryset.acount()
+    last = max(1, -(-count // page_size))
+    if not 1 <= number <= last:
+        raise UnsupportedRequestError
+
+    offset = (number - 1) * page_size
+    results = [
+        recipe async for recipe in queryset[offset:offset + page_size]
+    ]
+    url = request.build_absolute_uri()
+    previous = None
+    if number == 2:
+        previous = remove_query_param(url, param)
+    elif number > 2:
+        previous = replace_query_param(url, param, number - 1)
+    return {
+        "count": count,
+        "next": (
+            replace_query_param(url, param, number + 1)
+            if number < last
+            else None
+        ),
+        "previous": previous,
+        "results": results,
+    }
+
+
+@versions_condition("tags", decorator=async_condition)
+async def tag_list(request):
+    """Асинхронная версия TagsViewSet.list."""
+    tags = [tag async for tag in Tag.objects.all()]
+    return _render(TagSerializer(tags, many=True).data)
+
+
+@versions_condition("ingredients", decorator=async_condition)
+async def ingredient_list(request):
+    """Асинхронная версия IngredientViewSet.list с автодополнением."""
+    name = request.GET.get("name")
+    if not name:
+        ingredients = [
+            ingredient async for ingredient in Ingredient.objects.all()
+        ]
+        return _render(IngredientSerializer(ingredients, many=True).data)
+
+    ids = await sync_to_async(ingredient_index.search)(
+        name, limit=settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+    )
+    found = {
+        ingredient.id: ingredient
+        async for ingredient in Ingredient.objects.filter(id__in=ids)
+    }
+    ingredients = [found[id] for id in ids if id in found]
+    return _render(IngredientSerializer(ingredients, many=True).data)
+
+
+async def recipe_list(request):
+    """Асинхронная версия RecipeViewSet.list."""
+    key, response = await _get_cached(
+        request,
+        "recipe",
+        "list",
+        ("recipes", "recipe-counters", "tags", "ingredients", "users"),
+        {},
+    )
+    if response is not None:
+        return response
+
+    queryset = await sync_to_async(_filter_recipes)(
+        request, Recipe.objects.with_user_data(request.user)
+    )
+    page = await _paginate(request, queryset)
+    page["results"] = RecipeSerializer(
+        page["results"], many=True, context={"request": request}
+    ).data
+    return await _render_cached(key, page)
+
+
+@recipe_condition(decorator=async_condition)
+async def recipe_detail(request, pk):
+    """Асинхронная версия RecipeViewSet.retrieve."""
+    key, response = await _get_cached(
+        request,
+        "recipe",
+        "retrieve",
+        (f"recipe:{pk}", "tags", "ingredients", "users"),
+        {"pk": pk},
+    )
+    if response is not None:
+        return response
+
+    try:
+        recipe = await Recipe.objects.with_user_data(request.user).aget(
+            pk=pk
+        )
+    except (Recipe.DoesNotExist, ValueError):
+        raise UnsupportedRequestError
+    data = RecipeSerializer(recipe, context={"request": request}).data
+    return await _render_cached(key, data)
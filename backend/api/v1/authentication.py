@@ -0,0 +1,47 @@
+"""Модуль содержит аутентификацию по токену с кэшированием.
+
+Пользователь, найденный по токену, хранится в кэше Django
+TOKEN_CACHE_TIMEOUT секунд, поэтому повторные запросы с тем же токеном
+не обращаются к базе данных. Запись удаляется после фиксации транзакции
+при удалении токена (выход из системы), изменении или удалении
+пользователя, в том числе при смене пароля и деактивации.
+
+Удаление записи видно другим процессам только в общем кэше (Redis,
+Memcached). С кэшем процесса TOKEN_CACHE_TIMEOUT равен 0, и токены
+проверяются по базе данных при каждом запросе.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_PREFIX = "auth-token"
+
+
+def _token_cache_key(key):
+    # В ключ кэша попадает не сам токен, а его хэш.
+    return f"{TOKEN_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def invalidate_tokens(*keys):
+    """Удаляет из кэша пользователей токенов keys после фиксации."""
+    cache_keys = [_token_cache_key(key) for key in keys]
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, кэширующий пользователя токена."""
+
+    def authenticate_credentials(self, key):
+        if not settings.TOKEN_CACHE_TIMEOUT:
+            return super().authenticate_credentials(key)
+        cache_key = _token_cache_key(key)
+        user = cache.get(cache_key)
+        if user is not None:
+            return user, self.get_model()(key=key, user=user)
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, user, settings.TOKEN_CACHE_TIMEOUT)
+        return user, token
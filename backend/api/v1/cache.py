@@ -0,0 +1,150 @@
+"""Модуль содержит кэширование ответов API.
+
+Ответы для анонимных пользователей хранятся в кэше Django уже
+отрендеренными. Ключ ответа включает версии данных, от которых он
+зависит, поэтому при изменении данных достаточно сменить версию:
+старые записи перестают использоваться и истекают сами, а не удаляются
+одновременно, что исключает лавину промахов по всем ключам сразу.
+
+Кэш процесса (LocMemCache) не видит смены версий в других процессах,
+поэтому в нём версии истекают через CACHE_VERSION_TIMEOUT секунд и
+ответы устаревают не дольше этого времени.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+VERSION_PREFIX = "version"
+RESPONSE_PREFIX = "response"
+STATS_PREFIX = "response-cache"
+
+
+def _version_key(name):
+    return f"{VERSION_PREFIX}:{name}"
+
+
+def get_versions(*names):
+    """Возвращает версии данных с именами names.
+
+    Версия - это момент последнего изменения данных в наносекундах, поэтому
+    после вытеснения из кэша она не повторяет ни одно из прежних значений.
+    """
+    keys = {_version_key(name): name for name in names}
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, settings.CACHE_VERSION_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return tuple(versions[key] for key in keys)
+
+
+def bump_versions(*names):
+    """Меняет версии данных после фиксации текущей транзакции."""
+    def bump():
+        now = time.time_ns()
+        cache.set_many(
+            {_version_key(name): now for name in names},
+            settings.CACHE_VERSION_TIMEOUT,
+        )
+
+    transaction.on_commit(bump)
+
+
+def _count(event):
+    key = f"{STATS_PREFIX}:{event}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def get_stats():
+    """Возвращает число попаданий и промахов кэша ответов."""
+    stats = cache.get_many(
+        [f"{STATS_PREFIX}:hit", f"{STATS_PREFIX}:miss"]
+    )
+    return {
+        "hit": stats.get(f"{STATS_PREFIX}:hit", 0),
+        "miss": stats.get(f"{STATS_PREFIX}:miss", 0),
+    }
+
+
+def get_response_key(basename, action, names, kwargs, params, media_type):
+    """Возвращает ключ кэша ответа действия action вьюсета basename.
+
+    Ключ зависит от версий данных names, аргументов kwargs из адреса,
+    параметров запроса params и формата ответа media_type.
+    """
+    raw_key = repr(
+        (
+            get_versions(*names),
+            sorted(kwargs.items()),
+            sorted((name, sorted(values)) for name, values in params.lists()),
+            media_type,
+        )
+    )
+    digest = hashlib.md5(raw_key.encode()).hexdigest()
+    return f"{RESPONSE_PREFIX}:{basename}:{action}:{digest}"
+
+
+def get_cached_response(key, content_type):
+    """Возвращает ответ из кэша по ключу key или None."""
+    content = cache.get(key)
+    if content is None:
+        _count("miss")
+        return None
+    _count("hit")
+    return HttpResponse(content, content_type=content_type)
+
+
+def cache_response(key, content):
+    """Сохраняет отрендеренный ответ content в кэше."""
+    cache.set(key, content, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+class AnonymousCacheMixin:
+    """Кэширует ответы list и retrieve для анонимных пользователей.
+
+    Вьюсет задаёт get_cache_versions(), возвращающий имена версий данных,
+    от которых зависит ответ текущего действия.
+    """
+
+    def get_cache_versions(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
+
+    def _cached(self, handler, request, *args, **kwargs):
+        if (
+            request.user.is_authenticated
+            or request.accepted_renderer.format != "json"
+        ):
+            return handler(request, *args, **kwargs)
+
+        key = get_response_key(
+            self.basename,
+            self.action,
+            self.get_cache_versions(),
+            self.kwargs,
+            request.query_params,
+            request.accepted_media_type,
+        )
+        response = get_cached_response(key, request.accepted_media_type)
+        if response is not None:
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: cache_response(key, rendered.content)
+            )
+        return response
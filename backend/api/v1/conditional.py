@@ -0,0 +1,187 @@
+"""Модуль содержит поддержку условных GET-запросов (ETag, Last-Modified).
+
+Значения заголовков вычисляются до выполнения обработчика по версиям
+данных из кэша и, для рецептов, по дате изменения рецепта, поэтому ответ
+304 отдаётся без сериализации и почти без обращений к базе данных.
+
+ETag включает согласованный формат ответа, а заголовок Vary перечисляет
+заголовки запроса, от которых зависит ответ, чтобы промежуточные кэши
+не отдавали ответ в другом формате или ответ другого пользователя.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from recipes.models import Recipe
+
+from .cache import get_versions
+
+
+def _make_etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def _get_params(request):
+    # Ответ зависит от параметров запроса (фильтры, формат) и от формата,
+    # выбранного по заголовку Accept, поэтому они входят в ETag, а
+    # параметры - в порядке, не зависящем от клиента.
+    params = sorted(
+        (name, sorted(values)) for name, values in request.GET.lists()
+    )
+    media_type = getattr(
+        request, "accepted_media_type", request.META.get("HTTP_ACCEPT", "")
+    )
+    return params, media_type
+
+
+def _conditional(decorator, etag_func, last_modified_func, vary):
+    """Декоратор decorator, добавляющий к ответу заголовок Vary.
+
+    decorator - condition или async_condition.
+    """
+    conditional = decorator(
+        etag_func=etag_func, last_modified_func=last_modified_func
+    )
+
+    def wrapper(func):
+        view = conditional(func)
+        if asyncio.iscoroutinefunction(view):
+
+            @wraps(func)
+            async def inner(request, *args, **kwargs):
+                response = await view(request, *args, **kwargs)
+                patch_vary_headers(response, vary)
+                return response
+
+        else:
+
+            @wraps(func)
+            def inner(request, *args, **kwargs):
+                response = view(request, *args, **kwargs)
+                patch_vary_headers(response, vary)
+                return response
+
+        return inner
+
+    return wrapper
+
+
+def _to_datetime(nanoseconds):
+    return datetime.fromtimestamp(nanoseconds / 1e9, tz=timezone.utc)
+
+
+def async_condition(etag_func, last_modified_func):
+    """Вариант декоратора condition для асинхронных обработчиков GET.
+
+    Функции etag_func и last_modified_func обращаются к кэшу и базе
+    данных, поэтому выполняются через sync_to_async.
+    """
+
+    def get_state(request, *args, **kwargs):
+        etag = etag_func(request, *args, **kwargs)
+        last_modified = last_modified_func(request, *args, **kwargs)
+        return (
+            quote_etag(etag) if etag is not None else None,
+            int(last_modified.timestamp()) if last_modified else None,
+        )
+
+    def decorator(func):
+        @wraps(func)
+        async def inner(request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(get_state)(
+                request, *args, **kwargs
+            )
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = await func(request, *args, **kwargs)
+            if last_modified and not response.has_header("Last-Modified"):
+                response.headers["Last-Modified"] = http_date(last_modified)
+            if etag:
+                response.headers.setdefault("ETag", etag)
+            return response
+
+        return inner
+
+    return decorator
+
+
+def versions_condition(*names, decorator=condition):
+    """Условный GET для ответов, зависящих только от версий names.
+
+    Для асинхронных обработчиков передаётся decorator=async_condition.
+    """
+
+    def etag(request, *args, **kwargs):
+        return _make_etag(
+            names,
+            get_versions(*names),
+            sorted(kwargs.items()),
+            _get_params(request),
+        )
+
+    def last_modified(request, *args, **kwargs):
+        return _to_datetime(max(get_versions(*names)))
+
+    return _conditional(decorator, etag, last_modified, ("Accept",))
+
+
+def _get_recipe_state(request, pk):
+    # ETag и Last-Modified вычисляются по одним данным, поэтому
+    # результат запроса сохраняется на время обработки запроса.
+    if not hasattr(request, "recipe_state"):
+        try:
+            recipe = (
+                Recipe.objects.filter(pk=pk)
+                .values_list("pub_date", "updated_at")
+                .first()
+            )
+        except (ValueError, TypeError, ValidationError):
+            # Некорректный pk: ответ 404 вернёт сам обработчик.
+            recipe = None
+        if recipe is None:
+            request.recipe_state = None
+        else:
+            user = request.user
+            names = [f"recipe:{pk}", "tags", "ingredients", "users"]
+            if user.is_authenticated:
+                names.append(f"user-state:{user.pk}")
+            request.recipe_state = (
+                recipe,
+                user.pk,
+                get_versions(*names),
+            )
+    return request.recipe_state
+
+
+def recipe_condition(decorator=condition):
+    """Условный GET для страницы рецепта.
+
+    Ответ зависит от дат публикации и изменения рецепта, версий тегов,
+    ингредиентов и пользователей, а для авторизованного пользователя ещё
+    и от его избранного, корзины и подписок.
+    """
+
+    def etag(request, pk, *args, **kwargs):
+        state = _get_recipe_state(request, pk)
+        if state is None:
+            return None
+        return _make_etag(pk, *state, _get_params(request))
+
+    def last_modified(request, pk, *args, **kwargs):
+        state = _get_recipe_state(request, pk)
+        if state is None:
+            return None
+        (_, updated_at), _, versions = state
+        return max(updated_at, _to_datetime(max(versions)))
+
+    return _conditional(
+        decorator, etag, last_modified, ("Accept", "Authorization")
+    )
@@ -0,0 +1,100 @@
+"""Модуль содержит генераторы файлов со списком покупок.
+
+Каждый генератор принимает итератор строк вида
+{"name": ..., "unit": ..., "total_amount": ...} и отдаёт файл частями,
+чтобы ответ можно было передавать клиенту через StreamingHttpResponse.
+"""
+import csv
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+FIELDS = ("name", "unit", "total_amount")
+
+CHUNK_SIZE = 64 * 1024
+
+PDF_FONT_NAME = "ShoppingCartFont"
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 20 * mm
+PDF_LINE_HEIGHT = 7 * mm
+
+
+class Echo:
+    """Псевдо-файл, возвращающий записанную строку вместо её буферизации."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Отдаёт список покупок в формате csv построчно."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def stream_txt(rows):
+    """Отдаёт список покупок в текстовом формате построчно."""
+    for row in rows:
+        yield f"{row['name']} ({row['unit']}) — {row['total_amount']}\n"
+
+
+def _get_pdf_font():
+    font_path = getattr(settings, "SHOPPING_CART_PDF_FONT", None)
+    if not font_path or not os.path.exists(font_path):
+        return "Helvetica"
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return PDF_FONT_NAME
+
+
+def stream_pdf(rows):
+    """Отдаёт список покупок в формате pdf частями.
+
+    reportlab не умеет отдавать страницы до вызова save(), поэтому
+    документ пишется во временный файл, который выгружается на диск при
+    превышении CHUNK_SIZE, и затем читается клиенту частями.
+    """
+    font = _get_pdf_font()
+    _, height = A4
+
+    with SpooledTemporaryFile(max_size=CHUNK_SIZE) as buffer:
+        canvas = Canvas(buffer, pagesize=A4)
+        canvas.setTitle("Список покупок")
+        canvas.setFont(font, PDF_FONT_SIZE)
+
+        y = height - PDF_MARGIN
+        for number, row in enumerate(rows, start=1):
+            if y < PDF_MARGIN:
+                canvas.showPage()
+                canvas.setFont(font, PDF_FONT_SIZE)
+                y = height - PDF_MARGIN
+            canvas.drawString(
+                PDF_MARGIN,
+                y,
+                f"{number}. {row['name']} ({row['unit']}) — "
+                f"{row['total_amount']}",
+            )
+            y -= PDF_LINE_HEIGHT
+        canvas.save()
+
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", stream_csv),
+    "txt": ("text/plain; charset=utf-8", stream_txt),
+    "pdf": ("application/pdf", stream_pdf),
+}
@@ -1,34 +1,113 @@
 import base64
 import binascii
-import uuid
+import hashlib
+import re
+from tempfile import SpooledTemporaryFile
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, UnidentifiedImageError
 from rest_framework import serializers
 
+HEADER_RE = re.compile(r"data:(image/[a-z]+);base64,")
+
+IMAGE_TYPES = {
+    "image/png": "PNG",
+    "image/jpeg": "JPEG",
+    "image/gif": "GIF",
+    "image/webp": "WEBP",
+}
+
+# Длина части строки, декодируемой за один шаг; кратна 4, поэтому
+# каждая часть - самостоятельная последовательность base64.
+CHUNK_SIZE = 64 * 1024 * 4
+SPOOL_SIZE = 1024 * 1024
+
+
+def decoded_size(data, start):
+    """Возвращает размер данных base64 из data[start:] после декодирования."""
+    length = len(data) - start
+    padding = data.count("=", max(len(data) - 2, start))
+    return length // 4 * 3 - padding
+
 
 class Base64ImageField(serializers.ImageField):
+    """Поле изображения, передаваемого строкой data:image/...;base64,...
+
+    Заголовок и размер проверяются до декодирования. Строка декодируется
+    частями во временный файл, который остаётся в памяти до SPOOL_SIZE,
+    а тип изображения определяется Pillow по заголовку файла без
+    декодирования пикселей. Попутно вычисляется SHA-256 содержимого.
+    """
+
     def to_internal_value(self, base64_data):
-        if isinstance(base64_data, str) and ";base64," in base64_data:
-
-            header, base64_data = base64_data.split(";base64,")
-            mime_type = header.replace("data:", "")
-            file_name = str(uuid.uuid4())
-            file_extension = mime_type.split("/")[-1]
-
-            try:
-                decoded_data = base64.b64decode(base64_data)
-            except (TypeError, ValueError, binascii.Error):
-                raise ValidationError("Ошибка при декодировании картинки")
-
-            data = SimpleUploadedFile(
-                name=f"{file_name}.{file_extension}",
-                content=decoded_data,
-                content_type=mime_type,
+        if not isinstance(base64_data, str):
+            raise ValidationError(
+                "Неверный тип, не является base64 строкой: "
+                f"{type(base64_data)}"
             )
 
-            return super().to_internal_value(data)
+        match = HEADER_RE.match(base64_data)
+        if match is None:
+            raise ValidationError("Неверный формат картинки")
+        mime_type = match.group(1)
+        if mime_type not in IMAGE_TYPES:
+            raise ValidationError(
+                f"Неподдерживаемый тип картинки: {mime_type}"
+            )
+
+        start = match.end()
+        if (len(base64_data) - start) % 4:
+            raise ValidationError("Ошибка при декодировании картинки")
+        size = decoded_size(base64_data, start)
+        if size > settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise ValidationError(
+                "Размер картинки не должен превышать "
+                f"{settings.MAX_IMAGE_UPLOAD_SIZE} байт"
+            )
+
+        file = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        digest = hashlib.sha256()
+        try:
+            for position in range(start, len(base64_data), CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    base64_data[position:position + CHUNK_SIZE],
+                    validate=True,
+                )
+                digest.update(chunk)
+                file.write(chunk)
+            file.seek(0)
+            self._check_image(file, mime_type)
+        except ValidationError:
+            file.close()
+            raise
+        except (ValueError, binascii.Error):
+            file.close()
+            raise ValidationError("Ошибка при декодировании картинки")
 
-        raise ValidationError(
-            f"Неверный тип, не является base64 строкой: {type(base64_data)}"
+        file.seek(0)
+        uploaded = UploadedFile(
+            file=file,
+            name=f"{digest.hexdigest()}.{mime_type.split('/')[-1]}",
+            content_type=mime_type,
+            size=size,
         )
+        # Хранилище изображений использует хэш как имя файла.
+        uploaded.sha256 = digest.hexdigest()
+        return uploaded
+
+    @staticmethod
+    def _check_image(file, mime_type):
+        try:
+            with Image.open(file) as image:
+                image_format = image.format
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise ValidationError(
+                "Загрузите правильное изображение. Файл, который вы "
+                "загрузили, поврежден или не является изображением."
+            )
+        if image_format != IMAGE_TYPES[mime_type]:
+            raise ValidationError(
+                f"Содержимое картинки не соответствует типу {mime_type}"
+            )
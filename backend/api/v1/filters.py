@@ -1,12 +1,26 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import Case, When
 from django_filters.rest_framework import FilterSet, filters
+from recipes.autocomplete import ingredient_index
 from recipes.models import Recipe, Tag
 
 User = get_user_model()
 
 
 class IngredientFilter(FilterSet):
-    name = filters.CharFilter(field_name="name", lookup_expr="istartswith")
+    name = filters.CharFilter(method="filter_name")
+
+    def filter_name(self, queryset, name, value):
+        ids = ingredient_index.search(
+            value, limit=settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        )
+        if not ids:
+            return queryset.none()
+        ordering = Case(
+            *(When(id=id, then=position) for position, id in enumerate(ids))
+        )
+        return queryset.filter(id__in=ids).order_by(ordering)
 
 
 class RecipeFilter(FilterSet):
@@ -20,12 +34,23 @@ class RecipeFilter(FilterSet):
         field_name="tags__slug",
         to_field_name="slug",
     )
+    search = filters.CharFilter(method="filter_search")
+    ordering = filters.ChoiceFilter(
+        choices=(("popular", "popular"),),
+        method="filter_ordering",
+    )
 
     def filter_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
             return queryset.filter(favorite=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by("-favorites_count", "-pub_date", "-id")
+
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
             return queryset.filter(cart=self.request.user)
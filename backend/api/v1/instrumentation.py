@@ -0,0 +1,278 @@
+"""Модуль содержит сбор метрик запросов к API.
+
+InstrumentationMiddleware замеряет для каждого запроса число и время
+запросов к базе данных, время рендеринга ответа и общее время обработки,
+передаёт их клиенту в заголовке Server-Timing и накапливает гистограммы в
+памяти процесса. Гистограммы отдаются в текстовом формате Prometheus по
+адресу /api/metrics/; при нескольких процессах gunicorn каждый из них
+отдаёт свои значения. При INSTRUMENTATION_ENABLED = False middleware
+отключается при запуске и не добавляет накладных расходов.
+"""
+import asyncio
+import cProfile
+import hmac
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import Http404, HttpResponse
+
+from .cache import get_stats
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """Гистограмма значений с фиксированными границами корзин."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class Registry:
+    """Хранилище гистограмм, сгруппированных по представлению и методу."""
+
+    METRICS = {
+        "request_duration_seconds": (
+            "Общее время обработки запроса.",
+            DURATION_BUCKETS,
+        ),
+        "db_duration_seconds": (
+            "Время выполнения запросов к базе данных.",
+            DURATION_BUCKETS,
+        ),
+        "render_duration_seconds": (
+            "Время рендеринга ответа.",
+            DURATION_BUCKETS,
+        ),
+        "db_queries": (
+            "Число запросов к базе данных.",
+            QUERY_BUCKETS,
+        ),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(dict)
+
+    def observe(self, labels, values):
+        with self._lock:
+            histograms = self._histograms[labels]
+            for name, value in values.items():
+                if name not in histograms:
+                    histograms[name] = Histogram(self.METRICS[name][1])
+                histograms[name].observe(value)
+
+    def render(self):
+        """Возвращает метрики в текстовом формате Prometheus."""
+        lines = []
+        with self._lock:
+            for name, (description, _) in self.METRICS.items():
+                lines.append(f"# HELP foodgram_{name} {description}")
+                lines.append(f"# TYPE foodgram_{name} histogram")
+                for (view, method), histograms in sorted(
+                    self._histograms.items()
+                ):
+                    if name not in histograms:
+                        continue
+                    lines.extend(
+                        self._render_histogram(
+                            f"foodgram_{name}",
+                            f'view="{view}",method="{method}"',
+                            histograms[name],
+                        )
+                    )
+        stats = get_stats()
+        lines.append(
+            "# HELP foodgram_response_cache_total "
+            "Обращения к кэшу ответов API."
+        )
+        lines.append("# TYPE foodgram_response_cache_total counter")
+        for result in ("hit", "miss"):
+            lines.append(
+                f'foodgram_response_cache_total{{result="{result}"}} '
+                f"{stats[result]}"
+            )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(name, labels, histogram):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}'
+        yield f"{name}_sum{{{labels}}} {histogram.sum}"
+        yield f"{name}_count{{{labels}}} {histogram.count}"
+
+
+registry = Registry()
+
+
+class QueryTimer:
+    """Обёртка execute_wrapper, считающая запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+
+
+class InstrumentationMiddleware:
+    """Замеряет запросы и добавляет к ответу заголовок Server-Timing.
+
+    С вероятностью PROFILING_SAMPLE_RATE синхронный запрос выполняется под
+    cProfile, а профиль сохраняется в каталог PROFILING_DIR. Под ASGI
+    middleware работает асинхронно и не профилирует запросы.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        timer = QueryTimer()
+        profiler = None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+
+        started = perf_counter()
+        with connection.execute_wrapper(timer):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        total = perf_counter() - started
+
+        view = self._record(request, response, timer, total)
+        if profiler is not None:
+            self._dump_profile(profiler, view)
+        return response
+
+    async def __acall__(self, request):
+        # Соединения с базой данных привязаны к потоку, а запросы ORM
+        # выполняются в потоке sync_to_async текущего запроса, поэтому
+        # счётчик подключается в этом же потоке.
+        timer = QueryTimer()
+        with ExitStack() as stack:
+            await sync_to_async(self._start_timer)(stack, timer)
+            started = perf_counter()
+            try:
+                response = await self.get_response(request)
+            finally:
+                total = perf_counter() - started
+                await sync_to_async(stack.close)()
+        self._record(request, response, timer, total)
+        return response
+
+    @staticmethod
+    def _start_timer(stack, timer):
+        stack.enter_context(connection.execute_wrapper(timer))
+
+    def _record(self, request, response, timer, total):
+        """Сохраняет замеры запроса и возвращает имя представления."""
+        view = self._get_view_name(request)
+        render = getattr(request, "render_duration", 0.0)
+        registry.observe(
+            (view, request.method),
+            {
+                "request_duration_seconds": total,
+                "db_duration_seconds": timer.duration,
+                "render_duration_seconds": render,
+                "db_queries": timer.count,
+            },
+        )
+        response["Server-Timing"] = (
+            f"db;dur={timer.duration * 1000:.1f};"
+            f'desc="{timer.count} queries", '
+            f"render;dur={render * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}"
+        )
+        return view
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после этого метода, поэтому время
+        # рендеринга замеряется от его вызова до post-render callback.
+        started = perf_counter()
+
+        def finish(rendered):
+            request.render_duration = perf_counter() - started
+
+        response.add_post_render_callback(finish)
+        return response
+
+    @staticmethod
+    def _get_view_name(request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved"
+        return match.view_name
+
+    @staticmethod
+    def _dump_profile(profiler, view):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        profiler.dump_stats(
+            os.path.join(
+                settings.PROFILING_DIR,
+                f"{view}-{time.time_ns()}.prof",
+            )
+        )
+
+
+def _is_authorized(request):
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+
+
+def metrics(request):
+    """Отдаёт накопленные метрики в текстовом формате Prometheus.
+
+    Доступ есть у администраторов и у запросов с заголовком
+    Authorization: Bearer <METRICS_TOKEN>.
+    """
+    if not settings.INSTRUMENTATION_ENABLED or not _is_authorized(request):
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4"
+    )
@@ -1,5 +1,161 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = "limit"
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Курсорная пагинация по всем полям сортировки.
+
+    CursorPagination фильтрует выборку только по первому полю сортировки,
+    а записи с одинаковым значением этого поля пропускает смещением
+    OFFSET. Здесь позиция курсора хранит значения всех полей сортировки,
+    последнее из которых уникально, поэтому страница выбирается условием
+    по составному ключу и смещение не нужно.
+    """
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None:
+            return None
+        return cursor._replace(offset=0)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            _, reverse, position = self.cursor
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith("-") else f"-{field}"
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self._filter_by_position(queryset, ordering, position)
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > self.page_size:
+            following = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = following is not None
+            self.next_position = position
+            self.previous_position = following
+        else:
+            self.has_next = following is not None
+            self.has_previous = position is not None
+            self.next_position = following
+            self.previous_position = position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _filter_by_position(self, queryset, ordering, position):
+        """Оставляет в queryset записи, идущие после position."""
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError
+            return queryset.filter(self._get_position_filter(ordering, values))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _get_position_filter(ordering, values):
+        """Возвращает условие сравнения полей ordering со значениями values.
+
+        Записи сравниваются лексикографически: по первому различающемуся
+        полю в направлении сортировки.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(str(instance[name]))
+            else:
+                values.append(str(getattr(instance, name)))
+        return json.dumps(values)
+
+
+class RecipeCursorPagination(KeysetCursorPagination):
+    page_size_query_param = "limit"
+    ordering = ("-pub_date", "-id")
+    popular_ordering = ("-favorites_count", "-pub_date", "-id")
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get("ordering") == "popular":
+            return self.popular_ordering
+        return super().get_ordering(request, queryset, view)
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    page_size_query_param = "limit"
+    ordering = ("-follow_id",)
+
+
+class OptionalCursorPagination(PageLimitPagination):
+    """Постраничная пагинация с переходом на курсоры по запросу.
+
+    Если в запросе есть параметр cursor (в том числе пустой для первой
+    страницы), выборка разбивается курсорами cursor_pagination_class без
+    OFFSET и подсчёта общего количества записей. Иначе используются
+    привычные параметры page и limit.
+    """
+
+    cursor_query_param = "cursor"
+    cursor_pagination_class = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(OptionalCursorPagination):
+    cursor_pagination_class = RecipeCursorPagination
+
+
+class SubscriptionPagination(OptionalCursorPagination):
+    cursor_pagination_class = SubscriptionCursorPagination
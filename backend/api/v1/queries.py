@@ -0,0 +1,172 @@
+"""Модуль содержит поиск лишних запросов к базе данных.
+
+QueryRecorder записывает запросы, выполненные внутри блока with, вместе
+с местом в коде проекта, откуда они были вызваны. Запросы группируются
+по шаблону, из которого убраны параметры и литералы, и шаблон,
+повторившийся больше допустимого числа раз, считается признаком N+1.
+
+Вьюсеты объявляют бюджеты запросов для действий в атрибуте query_budgets.
+Бюджет включает запрос аутентификации по токену. QueryBudgetMixin для
+тестов Django и DRF и команда benchmark_api проверяют эндпоинты по этим
+бюджетам.
+"""
+import re
+import traceback
+from collections import defaultdict
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DUPLICATE_THRESHOLD = 3
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_RE = re.compile(r"%s|\?")
+IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+SPACE_RE = re.compile(r"\s+")
+TRANSACTION_RE = re.compile(
+    r"^(?:SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT|BEGIN|COMMIT)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize(sql):
+    """Возвращает шаблон запроса sql без параметров и литералов."""
+    template = STRING_RE.sub("?", sql)
+    template = NUMBER_RE.sub("?", template)
+    template = PLACEHOLDER_RE.sub("?", template)
+    template = IN_LIST_RE.sub("IN (...)", template)
+    return SPACE_RE.sub(" ", template).strip()
+
+
+def _find_origin(stack):
+    """Возвращает ближайший к запросу кадр стека из кода проекта."""
+    root = str(settings.BASE_DIR)
+    for frame in reversed(stack):
+        if (
+            frame.filename.startswith(root)
+            and frame.filename != __file__
+            and "site-packages" not in frame.filename
+        ):
+            path = frame.filename[len(root):].lstrip("/")
+            return f"{path}:{frame.lineno} in {frame.name}"
+    return "неизвестно"
+
+
+class RecordedQuery:
+    """Запрос, записанный QueryRecorder."""
+
+    def __init__(self, sql, duration, origin):
+        self.sql = sql
+        self.template = normalize(sql)
+        self.duration = duration
+        self.origin = origin
+
+
+class QueryRecorder:
+    """Записывает запросы к базе данных using внутри блока with."""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.connection = connections[using]
+        self.queries = []
+        self._wrapper = None
+
+    def __enter__(self):
+        self.queries = []
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __call__(self, execute, sql, params, many, context):
+        origin = _find_origin(traceback.extract_stack()[:-1])
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                RecordedQuery(sql, perf_counter() - started, origin)
+            )
+
+    def __len__(self):
+        return len(self.queries)
+
+    def duplicates(self, threshold=DUPLICATE_THRESHOLD):
+        """Возвращает шаблоны, выполненные больше threshold раз.
+
+        Результат - словарь шаблон: список запросов. Команды управления
+        транзакциями не учитываются.
+        """
+        groups = defaultdict(list)
+        for query in self.queries:
+            if not TRANSACTION_RE.match(query.template):
+                groups[query.template].append(query)
+        return {
+            template: queries
+            for template, queries in groups.items()
+            if len(queries) > threshold
+        }
+
+    def check(self, budget=None, threshold=DUPLICATE_THRESHOLD):
+        """Возвращает описания превышения бюджета и повторов запросов."""
+        problems = []
+        if budget is not None and len(self) > budget:
+            problems.append(
+                f"Выполнено запросов: {len(self)}, бюджет: {budget}."
+            )
+        for template, queries in self.duplicates(threshold).items():
+            origins = sorted({query.origin for query in queries})
+            problems.append(
+                f"N+1: запрос выполнен {len(queries)} раз из "
+                f"{', '.join(origins)}:\n    {template}"
+            )
+        return problems
+
+
+def get_query_budget(response):
+    """Возвращает бюджет запросов действия, обработавшего запрос.
+
+    Действие определяется по resolver_match ответа тестового клиента,
+    а бюджет берётся из атрибута query_budgets вьюсета.
+    """
+    match = getattr(response, "resolver_match", None)
+    view = getattr(match, "func", None)
+    actions = getattr(view, "actions", None)
+    if not actions:
+        return None
+    action = actions.get(response.wsgi_request.method.lower())
+    return getattr(view.cls, "query_budgets", {}).get(action)
+
+
+class QueryBudgetMixin:
+    """Примесь к TestCase, проверяющая число запросов эндпоинтов API.
+
+    Подходит для классов тестов Django и DRF, в том числе при запуске
+    через pytest-django.
+    """
+
+    duplicate_threshold = DUPLICATE_THRESHOLD
+
+    def assert_query_budget(self, method, path, *args, budget=None, **kwargs):
+        """Выполняет запрос тестовым клиентом и проверяет его запросы.
+
+        Если budget не задан, используется бюджет из query_budgets
+        вьюсета. Тест завершается ошибкой при превышении бюджета или
+        при повторе одного шаблона запроса больше duplicate_threshold раз.
+        """
+        with QueryRecorder() as recorder:
+            response = getattr(self.client, method)(path, *args, **kwargs)
+            if response.streaming:
+                # Потоковый ответ выполняет запросы при чтении.
+                response.streaming_content = [
+                    b"".join(response.streaming_content)
+                ]
+        if budget is None:
+            budget = get_query_budget(response)
+        problems = recorder.check(budget, self.duplicate_threshold)
+        if problems:
+            self.fail(f"{method.upper()} {path}:\n" + "\n".join(problems))
+        return response
@@ -1,8 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
 from django.db.models import F
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
-from rest_framework.serializers import (ListSerializer, ModelSerializer,
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingListItem, Tag)
+from rest_framework.serializers import (IntegerField, ModelSerializer,
+                                        SerializerMetaclass,
                                         SerializerMethodField)
 from rest_framework.validators import UniqueValidator, ValidationError
 
@@ -26,6 +30,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, author):
+        if hasattr(author, "is_subscribed"):
+            return author.is_subscribed
         user = self.context["request"].user
         return (
             user.is_authenticated
@@ -63,27 +69,75 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         }
 
 
-class LimitedListSerializer(ListSerializer):
-    def to_representation(self, data):
-        query_params = self.context["request"].query_params
-        try:
-            limit = int(query_params.get("recipes_limit"))
-        except (ValueError, TypeError):
-            limit = None
-        data = data.all()[:limit]
-        return super().to_representation(data)
+def get_recipes_limit(request):
+    """Возвращает значение параметра recipes_limit или None."""
+    try:
+        return max(int(request.query_params.get("recipes_limit")), 0)
+    except (ValueError, TypeError):
+        return None
+
+
+class RecipeImageMixin(metaclass=SerializerMetaclass):
+    """Добавляет ссылки на уменьшенные копии изображения рецепта.
+
+    Пока копии не созданы, image_thumb ссылается на исходное изображение,
+    а image_srcset пуст.
+    """
+
+    image_thumb = SerializerMethodField()
+    image_srcset = SerializerMethodField()
+
+    def _build_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get("request")
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+    def _get_thumbnails(self, recipe):
+        thumbnails = recipe.thumbnails
+        if recipe.image and thumbnails.get("source") == recipe.image.name:
+            return thumbnails
+        return {}
+
+    def get_image_thumb(self, recipe):
+        jpeg = self._get_thumbnails(recipe).get("jpeg")
+        if jpeg:
+            return self._build_url(jpeg[min(jpeg, key=int)])
+        if recipe.image:
+            return self._build_url(recipe.image.name)
+        return None
+
+    def get_image_srcset(self, recipe):
+        return {
+            image_format: ", ".join(
+                f"{self._build_url(name)} {width}w"
+                for width, name in sorted(
+                    names.items(), key=lambda item: int(item[0])
+                )
+            )
+            for image_format, names in self._get_thumbnails(recipe).items()
+            if image_format != "source"
+        }
 
 
-class ShortRecipeSerializer(ModelSerializer):
+class ShortRecipeSerializer(RecipeImageMixin, ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
-        list_serializer_class = LimitedListSerializer
+        fields = (
+            "id",
+            "name",
+            "image",
+            "image_thumb",
+            "image_srcset",
+            "cooking_time",
+        )
 
 
 class UserSubscribeSerializer(CustomUserSerializer):
-    recipes = ShortRecipeSerializer(many=True, read_only=True)
+    recipes = SerializerMethodField()
     recipes_count = SerializerMethodField()
+    followers_count = SerializerMethodField()
 
     class Meta:
         model = User
@@ -96,10 +150,29 @@ class UserSubscribeSerializer(CustomUserSerializer):
             "is_subscribed",
             "recipes",
             "recipes_count",
+            "followers_count",
         )
 
-    def get_recipes_count(self, user):
-        return user.recipes.count()
+    def get_recipes(self, author):
+        recipes = getattr(author, "latest_recipes", None)
+        if recipes is None:
+            limit = get_recipes_limit(self.context["request"])
+            recipes = author.recipes.all()[:limit]
+        return ShortRecipeSerializer(
+            recipes, many=True, context=self.context
+        ).data
+
+    def get_recipes_count(self, author):
+        profile = getattr(author, "profile", None)
+        if profile is None:
+            return author.recipes.count()
+        return profile.recipes_count
+
+    def get_followers_count(self, author):
+        profile = getattr(author, "profile", None)
+        if profile is None:
+            return author.following.count()
+        return profile.followers_count
 
 
 class TagSerializer(ModelSerializer):
@@ -114,7 +187,7 @@ class IngredientSerializer(ModelSerializer):
         fields = ("id", "name", "measurement_unit")
 
 
-class RecipeSerializer(ModelSerializer):
+class RecipeSerializer(RecipeImageMixin, ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = SerializerMethodField()
@@ -133,11 +206,26 @@ class RecipeSerializer(ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_thumb",
+            "image_srcset",
             "text",
             "cooking_time",
+            "favorites_count",
+            "carts_count",
         )
 
     def get_ingredients(self, recipe):
+        prefetched = getattr(recipe, "_prefetched_objects_cache", {})
+        if "recipes_ingredients" in prefetched:
+            return [
+                {
+                    "id": item.ingredient.id,
+                    "name": item.ingredient.name,
+                    "measurement_unit": item.ingredient.measurement_unit,
+                    "amount": item.amount,
+                }
+                for item in prefetched["recipes_ingredients"]
+            ]
         return recipe.ingredients.values(
             "id",
             "name",
@@ -146,6 +234,8 @@ class RecipeSerializer(ModelSerializer):
         )
 
     def get_is_favorited(self, recipe):
+        if hasattr(recipe, "is_favorited"):
+            return recipe.is_favorited
         user = self.context["request"].user
         return (
             user.is_authenticated
@@ -153,6 +243,8 @@ class RecipeSerializer(ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, "is_in_shopping_cart"):
+            return recipe.is_in_shopping_cart
         user = self.context["request"].user
         return (
             user.is_authenticated and user.carts.filter(id=recipe.id).exists()
@@ -170,10 +262,26 @@ class RecipeSerializer(ModelSerializer):
         if tags is None:
             raise ValidationError({"tags": "Обязательное поле."})
 
-        for id in tags:
-            if not Tag.objects.filter(id=id).exists():
-                message = f"Тег с id={id} не найден."
-                raise ValidationError({"tags": message})
+        if not isinstance(tags, list):
+            message = (
+                f"Недопустимые данные. "
+                f"Ожидался list, но был получен {type(tags)}."
+            )
+            raise ValidationError({"tags": message})
+        field = IntegerField(min_value=1)
+        try:
+            tags = [field.run_validation(id) for id in tags]
+        except ValidationError as error:
+            message = f"Поле tags: {' '.join(error.detail)}"
+            raise ValidationError({"tags": message})
+
+        if len(tags) != len(set(tags)):
+            message = "Список тегов не должен содержать повторы"
+            raise ValidationError({"tags": message})
+
+        for id in self._find_missing(Tag, tags):
+            message = f"Тег с id={id} не найден."
+            raise ValidationError({"tags": message})
 
         return tags
 
@@ -185,28 +293,48 @@ class RecipeSerializer(ModelSerializer):
             message = "Пустой список ингредиентов."
             raise ValidationError({"ingredients": message})
 
-        if len(ingredients) != len({i["id"] for i in ingredients}):
-            message = "Список ингредиентов не должен содержать повторы"
-            raise ValidationError({"ingredients": message})
-
         for ingredient in ingredients:
             if not isinstance(ingredient, dict):
                 message = (
                     f"Недопустимые данные. "
                     f"Ожидался dict, но был получен {type(ingredient)}."
                 )
-                ValidationError({"ingredients": message})
+                raise ValidationError({"ingredients": message})
             if "id" not in ingredient or "amount" not in ingredient:
                 message = "Отсутствуют обязательные поля."
                 raise ValidationError({"ingredients": message})
+        ingredients = [
+            self._validate_ingredient(ingredient) for ingredient in ingredients
+        ]
 
-            id = ingredient["id"]
-            if not Ingredient.objects.filter(id=id).exists():
-                message = f"Ингредиент с id={id} не найден."
-                raise ValidationError({"ingredients": message})
+        ids = [ingredient["id"] for ingredient in ingredients]
+        if len(ids) != len(set(ids)):
+            message = "Список ингредиентов не должен содержать повторы"
+            raise ValidationError({"ingredients": message})
+
+        for id in self._find_missing(Ingredient, ids):
+            message = f"Ингредиент с id={id} не найден."
+            raise ValidationError({"ingredients": message})
 
         return ingredients
 
+    @staticmethod
+    def _validate_ingredient(ingredient):
+        """Приводит id и количество ингредиента к целым числам."""
+        fields = {
+            "id": IntegerField(min_value=1),
+            # Верхняя граница - максимум PositiveSmallIntegerField.
+            "amount": IntegerField(min_value=1, max_value=32767),
+        }
+        validated = {}
+        for name, field in fields.items():
+            try:
+                validated[name] = field.run_validation(ingredient[name])
+            except ValidationError as error:
+                message = f"Поле {name}: {' '.join(error.detail)}"
+                raise ValidationError({"ingredients": message})
+        return validated
+
     def validate(self, data):
         data["tags"] = self.validate_tags(self.initial_data.get("tags"))
         data["ingredients"] = self.validate_ingredients(
@@ -215,17 +343,22 @@ class RecipeSerializer(ModelSerializer):
         data["author"] = self.context["request"].user
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
 
         recipe = Recipe.objects.create(**validated_data)
 
-        recipe.tags.set(tags)
-        self._set_ingredients(recipe, ingredients)
+        recipe.tags.add(*tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient_id=id, amount=amount)
+            for id, amount in self._get_amounts(ingredients).items()
+        )
 
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         recipe.image = validated_data.get("image", recipe.image)
         recipe.name = validated_data.get("name", recipe.name)
@@ -235,15 +368,68 @@ class RecipeSerializer(ModelSerializer):
         )
         recipe.tags.set(validated_data.get("tags"))
         self._set_ingredients(recipe, validated_data.get("ingredients"))
-        recipe.save()
+        # Счётчики обновляются атомарно в обработчиках сигналов,
+        # поэтому сохраняются только редактируемые поля.
+        recipe.save(
+            update_fields=(
+                "image",
+                "name",
+                "text",
+                "cooking_time",
+                "updated_at",
+            )
+        )
         return recipe
 
     @staticmethod
-    def _set_ingredients(recipe, ingredients):
-        recipe.ingredients.clear()
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
-                recipe=recipe,
-                ingredient_id=ingredient["id"],
-                amount=ingredient["amount"],
-            )
+    def _find_missing(model, ids):
+        found = set(
+            model.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+        return [id for id in ids if id not in found]
+
+    @staticmethod
+    def _get_amounts(ingredients):
+        return {
+            ingredient["id"]: ingredient["amount"]
+            for ingredient in ingredients
+        }
+
+    def _set_ingredients(self, recipe, ingredients):
+        """Приводит ингредиенты рецепта к списку ingredients.
+
+        Удаляются, добавляются и обновляются только изменившиеся строки.
+        """
+        amounts = self._get_amounts(ingredients)
+        current = {
+            item.ingredient_id: item
+            for item in recipe.recipes_ingredients.all()
+        }
+
+        removed = [
+            item for id, item in current.items() if id not in amounts
+        ]
+        added = [
+            RecipeIngredient(recipe=recipe, ingredient_id=id, amount=amount)
+            for id, amount in amounts.items()
+            if id not in current
+        ]
+        changed = []
+        for id, amount in amounts.items():
+            if id in current and current[id].amount != amount:
+                current[id].amount = amount
+                changed.append(current[id])
+
+        if removed:
+            RecipeIngredient.objects.filter(
+                id__in=[item.id for item in removed]
+            ).delete()
+        if added:
+            RecipeIngredient.objects.bulk_create(added)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ("amount",))
+
+        ShoppingListItem.objects.refresh(
+            recipe.cart.values_list("id", flat=True),
+            [item.ingredient_id for item in (*removed, *added, *changed)],
+        )
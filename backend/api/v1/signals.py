@@ -0,0 +1,110 @@
+"""Модуль содержит обработчики сигналов, сбрасывающие кэш API."""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Follow, Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens
+from .cache import bump_versions
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    bump_versions("recipes", f"recipe:{instance.pk}")
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredient(sender, instance, **kwargs):
+    bump_versions("recipes", f"recipe:{instance.recipe_id}")
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        bump_versions("recipes", "tags")
+    else:
+        bump_versions("recipes", f"recipe:{instance.pk}")
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    bump_versions("tags")
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    bump_versions("ingredients")
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_users(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    bump_versions("users")
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # Пользователь хранится в кэше токенов целиком, поэтому запись
+    # сбрасывается при любом изменении, кроме времени последнего входа.
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    invalidate_tokens(
+        *Token.objects.filter(user=instance).values_list("key", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(m2m_changed, sender=Recipe.favorite.through)
+@receiver(m2m_changed, sender=Recipe.cart.through)
+def invalidate_user_recipes(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    # Связи, удаляемые clear(), известны только до их удаления.
+    if action == "pre_clear":
+        links = sender.objects.filter(
+            **{"user" if reverse else "recipe": instance}
+        )
+        instance.cleared_links = list(
+            links.values_list("user_id", "recipe_id")
+        )
+        return
+    if not action.startswith("post_"):
+        return
+
+    if action == "post_clear":
+        links = instance.cleared_links
+    elif reverse:
+        links = [(instance.pk, pk) for pk in pk_set]
+    else:
+        links = [(pk, instance.pk) for pk in pk_set]
+
+    # Общая версия рецептов не меняется: от неё зависят и ETag, и кэш
+    # всех ответов с рецептами. Счётчики favorites_count и carts_count
+    # (и сортировка popular) есть только в списке рецептов, поэтому его
+    # кэш дополнительно зависит от отдельной версии recipe-counters.
+    bump_versions(
+        "recipe-counters",
+        *{f"user-state:{user_id}" for user_id, _ in links},
+        *{f"recipe:{recipe_id}" for _, recipe_id in links},
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_user_follows(sender, instance, **kwargs):
+    bump_versions(f"user-state:{instance.user_id}")
@@ -1,6 +1,10 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import (async_read, ingredient_list, recipe_detail,
+                          recipe_list, tag_list)
+from .instrumentation import metrics
 from .views import (IngredientViewSet, RecipeViewSet, SubscriptionViewSet,
                     TagsViewSet)
 
@@ -13,4 +17,36 @@ v1_router.register("users", SubscriptionViewSet)
 urlpatterns = v1_router.urls + [
     path("", include("djoser.urls.base")),
     path("auth/", include("djoser.urls.authtoken")),
+    path("metrics/", metrics, name="metrics"),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Адрес рецепта принимает только числовой pk, чтобы не перекрывать
+    # действия вьюсета вида recipes/feed/.
+    router_views = {
+        pattern.name: pattern.callback for pattern in v1_router.urls
+    }
+    urlpatterns = [
+        re_path(
+            r"^tags/$",
+            async_read(tag_list, router_views["tag-list"]),
+            name="tag-list",
+        ),
+        re_path(
+            r"^ingredients/$",
+            async_read(ingredient_list, router_views["ingredient-list"]),
+            name="ingredient-list",
+        ),
+        re_path(
+            r"^recipes/$",
+            async_read(recipe_list, router_views["recipe-list"]),
+            name="recipe-list",
+        ),
+        re_path(
+            # Только числовые pk: остальные адреса вида recipes/<имя>/
+            # (feed, trending, download_shopping_cart) - действия вьюсета.
+            r"^recipes/(?P<pk>\d+)/$",
+            async_read(recipe_detail, router_views["recipe-detail"]),
+            name="recipe-detail",
+        ),
+    ] + urlpatterns
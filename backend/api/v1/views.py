@@ -1,12 +1,15 @@
 """Модуль содержит обработчики запросов к API."""
-import csv
+from collections import defaultdict
+from itertools import chain
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.db.models import F, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import Follow, Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.models import Follow, Ingredient, Recipe, Tag
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -14,15 +17,22 @@ from rest_framework.response import Response
 from rest_framework.viewsets import (GenericViewSet, ModelViewSet,
                                      ReadOnlyModelViewSet)
 
+from .cache import AnonymousCacheMixin
+from .conditional import recipe_condition, versions_condition
+from .exports import EXPORT_FORMATS
 from .filters import IngredientFilter, RecipeFilter
+from .pagination import (PageLimitPagination, RecipeCursorPagination,
+                         RecipePagination, SubscriptionPagination)
 from .permissions import IsOwnerOrReadOnly
 from .serializers import (IngredientSerializer, RecipeSerializer,
                           ShortRecipeSerializer, TagSerializer,
-                          UserSubscribeSerializer)
+                          UserSubscribeSerializer, get_recipes_limit)
 
 User = get_user_model()
 
 
+@method_decorator(versions_condition("tags"), name="list")
+@method_decorator(versions_condition("tags"), name="retrieve")
 class TagsViewSet(ReadOnlyModelViewSet):
     """Вьюсет, позволяющий получить данные модели Tag."""
 
@@ -30,8 +40,11 @@ class TagsViewSet(ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     permission_classes = (AllowAny,)
     pagination_class = None
+    query_budgets = {"list": 2, "retrieve": 2}
 
 
+@method_decorator(versions_condition("ingredients"), name="list")
+@method_decorator(versions_condition("ingredients"), name="retrieve")
 class IngredientViewSet(ReadOnlyModelViewSet):
     """Вьюсет, позволяющий получить данные модели Ingredient."""
 
@@ -41,13 +54,16 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
+    query_budgets = {"list": 2, "retrieve": 2}
 
 
-class RecipeViewSet(ModelViewSet):
+@method_decorator(recipe_condition(), name="retrieve")
+class RecipeViewSet(AnonymousCacheMixin, ModelViewSet):
     """Вьюсет для работы с рецептами.
 
     Позволяет получать/создавать/редактировать/удалять рецепты,
     добавлять рецепты в избранное и в корзину, скачивать список покупок.
+    Списки и страницы рецептов для анонимных пользователей кэшируются.
     """
 
     serializer_class = RecipeSerializer
@@ -55,6 +71,62 @@ class RecipeViewSet(ModelViewSet):
     permission_classes = (IsOwnerOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
+    query_budgets = {
+        "list": 6,
+        "retrieve": 6,
+        "trending": 6,
+        "feed": 5,
+        "download_shopping_cart": 2,
+    }
+
+    def get_queryset(self):
+        return Recipe.objects.with_user_data(self.request.user)
+
+    def get_cache_versions(self):
+        if self.action == "retrieve":
+            recipes = (f"recipe:{self.kwargs['pk']}",)
+        else:
+            recipes = ("recipes", "recipe-counters")
+        return (*recipes, "tags", "ingredients", "users")
+
+    @action(
+        methods=("GET",),
+        detail=False,
+        pagination_class=PageLimitPagination,
+    )
+    def trending(self, request):
+        """Возвращает рецепты, популярные в последнее время.
+
+        Рейтинг заранее вычисляется командой compute_trending по журналу
+        добавлений в избранное и корзину с затуханием по времени.
+        """
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .filter(trend__isnull=False)
+            .order_by("-trend__score", "-pub_date", "-id")
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=("GET",),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=RecipeCursorPagination,
+    )
+    def feed(self, request):
+        """Возвращает ленту рецептов авторов, на которых подписан пользователь.
+
+        Лента всегда разбивается на страницы курсорами.
+        """
+        queryset = self.filter_queryset(
+            self.get_queryset().feed(request.user, settings.FEED_FANOUT_LIMIT)
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(
         methods=("POST", "DELETE"),
@@ -92,37 +164,56 @@ class RecipeViewSet(ModelViewSet):
 
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
-    @action(methods=("GET",), detail=False)
+    @action(
+        methods=("GET",),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
     def download_shopping_cart(self, request):
-        """Возвращает список покупок в формате csv.
+        """Возвращает список покупок в формате csv, txt или pdf.
 
         В списке должны быть перечислены ингредиенты,
         необходимые для приготовления блюд, добавленных в корзину пользователя.
+        Формат выбирается параметром format, по умолчанию csv.
+        Список читается одним запросом из заранее посчитанной таблицы
+        ShoppingListItem и отдаётся клиенту потоком.
         """
-        user = request.user
-        if not user.carts.exists():
-            return Response(status=status.HTTP_400_BAD_REQUEST)
+        export_format = request.query_params.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            data = {"errors": f"Неподдерживаемый формат: {export_format}."}
+            return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
 
         ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__in=user.carts.all(),
-            )
-            .values(
+            request.user.shopping_list.values(
+                "total_amount",
                 name=F("ingredient__name"),
                 unit=F("ingredient__measurement_unit"),
             )
-            .annotate(total_amount=Sum("amount"))
+            .order_by("name", "unit")
+            .iterator()
         )
+        first = next(ingredients, None)
+        if first is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = "attachment;filename=cart.csv"
-
-        writer = csv.writer(response)
-        writer.writerow(ingredients.first().keys())
-        for ingredient in list(ingredients):
-            writer.writerow(ingredient.values())
+        content_type, stream = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            stream(chain((first,), ingredients)),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = (
+            f"attachment;filename=cart.{export_format}"
+        )
         return response
 
+    def perform_content_negotiation(self, request, force=False):
+        # Параметр format у списка покупок выбирает формат файла,
+        # а не рендерер DRF, поэтому ошибка согласования не должна
+        # приводить к ответу 404.
+        if self.action == "download_shopping_cart":
+            force = True
+        return super().perform_content_negotiation(request, force)
+
     def _add_recipe(self, manager, recipe):
         if manager.filter(id=recipe.id).exists():
             data = {"errors": "Рецепт был добавлен ранее."}
@@ -147,12 +238,37 @@ class SubscriptionViewSet(GenericViewSet):
     serializer_class = UserSubscribeSerializer
     queryset = User.objects.all()
     permission_classes = (IsAuthenticated,)
+    pagination_class = SubscriptionPagination
+    query_budgets = {"subscriptions": 4}
 
     @action(methods=("GET",), detail=False)
     def subscriptions(self, request):
-        """Метод для получения списка подписок."""
-        authors = User.objects.filter(following__user=request.user)
+        """Метод для получения списка подписок.
+
+        Авторы упорядочены от последней подписки к первой. Счётчики
+        читаются из профиля в том же запросе, что и авторы, а последние
+        рецепты всех авторов страницы загружаются одним дополнительным
+        запросом.
+        """
+        authors = (
+            User.objects.filter(following__user=request.user)
+            .select_related("profile")
+            .annotate(
+                follow_id=F("following__id"),
+                is_subscribed=Value(True),
+            )
+            .order_by("-follow_id")
+        )
         pages = self.paginate_queryset(authors)
+
+        recipes = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_author(
+            pages, get_recipes_limit(request)
+        ):
+            recipes[recipe.author_id].append(recipe)
+        for author in pages:
+            author.latest_recipes = recipes[author.id]
+
         serializer = self.get_serializer(pages, many=True)
         return self.get_paginated_response(serializer.data)
 
@@ -16,8 +16,9 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "recipes",
-    "api",
+    "api.v1.apps.ApiConfig",
     "rest_framework",
     "rest_framework.authtoken",
     "djoser",
@@ -25,6 +26,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.v1.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -53,6 +55,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "foodgram.wsgi.application"
+ASGI_APPLICATION = "foodgram.asgi.application"
+
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", default="False") == "True"
 
 DATABASES = {
     "default": {
@@ -64,9 +69,47 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", default="postgres"),
         "HOST": os.getenv("DB_HOST", default="db"),
         "PORT": os.getenv("DB_PORT", default="5432"),
+        # Под ASGI соединения открываются в потоках отдельных запросов,
+        # поэтому постоянные соединения по умолчанию отключены.
+        "CONN_MAX_AGE": int(
+            os.getenv("CONN_MAX_AGE", 0 if ASYNC_READ_VIEWS else 60)
+        ),
+        "CONN_HEALTH_CHECKS": (
+            os.getenv("CONN_HEALTH_CHECKS", default="True") == "True"
+        ),
+        # Для pgbouncer в режиме пула транзакций.
+        "DISABLE_SERVER_SIDE_CURSORS": (
+            os.getenv("DISABLE_SERVER_SIDE_CURSORS", default="False")
+            == "True"
+        ),
+    }
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default="foodgram"),
     }
 }
 
+RESPONSE_CACHE_TIMEOUT = 300
+# Версии данных в кэше процесса (LocMemCache) не узнают об изменениях,
+# сделанных другими процессами gunicorn, командами и админкой, поэтому
+# хранятся ограниченное время. С общим кэшем (Redis, Memcached) версии
+# бессрочные.
+CACHE_VERSION_TIMEOUT = (
+    60 if CACHES["default"]["BACKEND"].endswith(".LocMemCache") else None
+)
+# Пользователь токена кэшируется только в общем кэше: удаление записи при
+# выходе, смене пароля или деактивации в кэше процесса (LocMemCache) не
+# дошло бы до других процессов gunicorn, и токен продолжал бы действовать.
+TOKEN_CACHE_TIMEOUT = (
+    0 if CACHES["default"]["BACKEND"].endswith(".LocMemCache") else 60
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -96,11 +139,49 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+SHOPPING_CART_PDF_FONT = os.getenv(
+    "SHOPPING_CART_PDF_FONT",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+INGREDIENT_AUTOCOMPLETE_LIMIT = 50
+INGREDIENT_INDEX_TTL = 300
+
+TRENDING_WEIGHTS = {"favorite": 1.0, "cart": 2.0}
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_WINDOW_DAYS = 14
+
+FEED_FANOUT_LIMIT = int(os.getenv("FEED_FANOUT_LIMIT", 1000))
+FEED_BACKFILL_SIZE = 100
+
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.getenv("MAX_IMAGE_UPLOAD_SIZE", 10 * 1024 * 1024)
+)
+
+MEDIA_ORPHAN_GRACE = 600
+
+IMAGE_THUMBNAIL_WIDTHS = (320, 640, 1280)
+IMAGE_THUMBNAIL_FORMATS = ("webp", "jpeg")
+IMAGE_THUMBNAIL_QUALITY = 80
+IMAGE_PROCESSING_WORKERS = int(os.getenv("IMAGE_PROCESSING_WORKERS", 2))
+IMAGE_PROCESSING_SYNC = (
+    os.getenv("IMAGE_PROCESSING_SYNC", default="False") == "True"
+)
+
+INSTRUMENTATION_ENABLED = (
+    os.getenv("INSTRUMENTATION_ENABLED", default="True") == "True"
+)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", default="")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0))
+PROFILING_DIR = os.getenv(
+    "PROFILING_DIR", default=os.path.join(BASE_DIR, "profiles")
+)
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.v1.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
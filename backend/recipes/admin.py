@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
 
-from .models import Follow, Ingredient, Recipe, RecipeIngredient, Tag
+from .models import (Follow, Ingredient, Profile, Recipe, RecipeIngredient,
+                     ShoppingListItem, Tag)
 
 User = get_user_model()
 
@@ -34,10 +35,11 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = ("name", "author", "favorites_count")
     list_filter = ("author", "name", "tags")
 
-    def favorites_count(self, recipe):
-        return recipe.favorite.count()
 
-    favorites_count.short_description = "Число добавлений рецепта в избранное"
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ("user", "recipes_count", "followers_count")
+    readonly_fields = ("recipes_count", "followers_count")
 
 
 @admin.register(Follow)
@@ -48,3 +50,34 @@ class FollowAdmin(admin.ModelAdmin):
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ("recipe", "ingredient", "amount")
+
+    def save_model(self, request, obj, form, change):
+        items = [(obj.recipe_id, obj.ingredient_id)]
+        if change:
+            # Строка могла перейти к другому рецепту или ингредиенту:
+            # списки покупок пересчитываются и для прежних значений.
+            items.append(
+                RecipeIngredient.objects.values_list(
+                    "recipe_id", "ingredient_id"
+                ).get(pk=obj.pk)
+            )
+        super().save_model(request, obj, form, change)
+        self._refresh_shopping_lists(*zip(*items))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._refresh_shopping_lists([obj.recipe_id], [obj.ingredient_id])
+
+    def delete_queryset(self, request, queryset):
+        items = list(queryset.values_list("recipe_id", "ingredient_id"))
+        super().delete_queryset(request, queryset)
+        self._refresh_shopping_lists(*zip(*items))
+
+    @staticmethod
+    def _refresh_shopping_lists(recipe_ids, ingredient_ids):
+        ShoppingListItem.objects.refresh(
+            User.objects.filter(carts__in=recipe_ids)
+            .distinct()
+            .values_list("id", flat=True),
+            set(ingredient_ids),
+        )
@@ -0,0 +1,90 @@
+"""Модуль содержит индекс для автодополнения названий ингредиентов.
+
+Ингредиенты - редко изменяемый справочник, поэтому нормализованные
+названия хранятся в памяти процесса в отсортированном списке, а поиск
+по префиксу выполняется бинарным поиском без обращения к базе данных.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Ingredient
+from .utils import normalize
+
+
+class IngredientIndex:
+    """Индекс нормализованных названий ингредиентов.
+
+    Индекс строится при первом обращении и перестраивается после вызова
+    invalidate() или по истечении INGREDIENT_INDEX_TTL секунд, что
+    защищает от устаревания при изменениях, сделанных другими процессами.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = None
+        self._ids = None
+        self._built_at = 0.0
+        self._generation = 0
+
+    def invalidate(self):
+        """Помечает индекс устаревшим."""
+        with self._lock:
+            self._generation += 1
+            self._names = self._ids = None
+
+    def _is_expired(self):
+        ttl = getattr(settings, "INGREDIENT_INDEX_TTL", None)
+        return bool(ttl) and time.monotonic() - self._built_at > ttl
+
+    def _get_entries(self):
+        names, ids = self._names, self._ids
+        if names is not None and not self._is_expired():
+            return names, ids
+
+        generation = self._generation
+        entries = sorted(
+            (normalize(name), id)
+            for id, name in Ingredient.objects.values_list("id", "name")
+        )
+        names = [name for name, _ in entries]
+        ids = [id for _, id in entries]
+        with self._lock:
+            if generation == self._generation:
+                self._names, self._ids = names, ids
+                self._built_at = time.monotonic()
+        return names, ids
+
+    def search(self, query, limit=None):
+        """Возвращает id ингредиентов, подходящих под запрос query.
+
+        Сначала идут названия, начинающиеся с query, затем названия,
+        содержащие query в середине; внутри групп - в алфавитном порядке.
+        """
+        query = normalize(query)
+        names, ids = self._get_entries()
+        if limit is None:
+            limit = len(names)
+
+        result = []
+        position = bisect.bisect_left(names, query)
+        while (
+            position < len(names)
+            and len(result) < limit
+            and names[position].startswith(query)
+        ):
+            result.append(ids[position])
+            position += 1
+
+        for name, id in zip(names, ids):
+            if len(result) >= limit:
+                break
+            if query in name and not name.startswith(query):
+                result.append(id)
+
+        return result
+
+
+ingredient_index = IngredientIndex()
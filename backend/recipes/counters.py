@@ -0,0 +1,76 @@
+"""Модуль содержит пересчёт денормализованных счётчиков."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_related(queryset, field, outer="pk"):
+    """Подзапрос, считающий строки queryset, у которых field = outer."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("*"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def reconcile(queryset, counters):
+    """Приводит счётчики объектов queryset к фактическим значениям.
+
+    counters сопоставляет имя поля счётчика с выражением, вычисляющим его
+    фактическое значение. Обновляются только строки с расхождениями.
+    Возвращает число исправленных строк по каждому счётчику.
+    """
+    fixed = {}
+    for field, expected in counters.items():
+        mismatched = (
+            queryset.alias(expected=expected)
+            .exclude(**{field: F("expected")})
+            .values("pk")
+        )
+        fixed[field] = queryset.model.objects.filter(
+            pk__in=Subquery(mismatched)
+        ).update(**{field: expected})
+    return fixed
+
+
+def reconcile_all(recipe_model, profile_model, user_model, follow_model):
+    """Пересчитывает счётчики рецептов и профилей пользователей.
+
+    Модели передаются параметрами, чтобы функцию можно было вызывать из
+    миграций с историческими версиями моделей.
+    """
+    profile_model.objects.bulk_create(
+        profile_model(user_id=id)
+        for id in user_model.objects.filter(profile__isnull=True).values_list(
+            "id", flat=True
+        )
+    )
+    fixed = reconcile(
+        recipe_model.objects.all(),
+        {
+            "favorites_count": count_related(
+                recipe_model.favorite.through.objects.all(), "recipe"
+            ),
+            "carts_count": count_related(
+                recipe_model.cart.through.objects.all(), "recipe"
+            ),
+        },
+    )
+    fixed.update(
+        reconcile(
+            profile_model.objects.all(),
+            {
+                "recipes_count": count_related(
+                    recipe_model.objects.all(), "author", outer="user_id"
+                ),
+                "followers_count": count_related(
+                    follow_model.objects.all(), "author", outer="user_id"
+                ),
+            },
+        )
+    )
+    return fixed
@@ -0,0 +1,91 @@
+"""Модуль содержит потоковый экспорт справочников и рецептов.
+
+Записи выбираются из базы данных частями через iterator(chunk_size), а на
+PostgreSQL - серверным курсором, поэтому потребление памяти не зависит
+от размера каталога. Формат записей совпадает с форматом импорта.
+"""
+from django.db import connections
+from django.db.models import Prefetch
+
+from .models import Ingredient, Recipe, RecipeIngredient, Tag
+
+
+def _iterate(queryset, chunk_size):
+    """Перебирает объекты queryset, упорядоченного по id, частями.
+
+    Если серверные курсоры отключены (DISABLE_SERVER_SIDE_CURSORS при
+    работе через pgbouncer), iterator() загрузил бы всю выборку в память
+    клиента, поэтому части выбираются отдельными запросами по id.
+    """
+    settings_dict = connections[queryset.db].settings_dict
+    if not settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1].id
+
+
+def export_ingredients(chunk_size):
+    """Возвращает записи ингредиентов."""
+    ingredients = Ingredient.objects.order_by("id").only(
+        "name", "measurement_unit"
+    )
+    for ingredient in _iterate(ingredients, chunk_size):
+        yield {
+            "name": ingredient.name,
+            "measurement_unit": ingredient.measurement_unit,
+        }
+
+
+def export_tags(chunk_size):
+    """Возвращает записи тегов."""
+    for tag in _iterate(Tag.objects.order_by("id"), chunk_size):
+        yield {"name": tag.name, "color": tag.color, "slug": tag.slug}
+
+
+def export_recipes(chunk_size):
+    """Возвращает записи рецептов с тегами и ингредиентами."""
+    recipes = (
+        Recipe.objects.order_by("id")
+        .select_related("author")
+        .prefetch_related(
+            "tags",
+            Prefetch(
+                "recipes_ingredients",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ).order_by("id"),
+            ),
+        )
+    )
+    for recipe in _iterate(recipes, chunk_size):
+        yield {
+            "author": recipe.author.username,
+            "name": recipe.name,
+            "image": recipe.image.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "pub_date": recipe.pub_date.isoformat(),
+            "tags": [tag.slug for tag in recipe.tags.all()],
+            "ingredients": [
+                {
+                    "name": item.ingredient.name,
+                    "measurement_unit": item.ingredient.measurement_unit,
+                    "amount": item.amount,
+                }
+                for item in recipe.recipes_ingredients.all()
+            ],
+        }
+
+
+EXPORTERS = {
+    "ingredients": export_ingredients,
+    "tags": export_tags,
+    "recipes": export_recipes,
+}
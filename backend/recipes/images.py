@@ -0,0 +1,203 @@
+"""Модуль содержит обработку изображений рецептов.
+
+Загруженное изображение сохраняется как есть, а уменьшенные копии
+нескольких ширин в форматах WebP и JPEG создаются после фиксации
+транзакции в пуле фоновых потоков, вне обработки запроса. Копии
+сохраняются без метаданных EXIF, а их имена записываются в поле
+Recipe.thumbnails вместе с именем исходного файла.
+
+Изображения хранятся по хэшу содержимого и могут принадлежать нескольким
+рецептам, поэтому файл удаляется вместе с копиями, только когда на него
+не ссылается ни один рецепт.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS_DIR = "recipes/thumbnails"
+PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+
+def _render(image, width, image_format):
+    height = round(image.height * width / image.width)
+    thumbnail = image.resize((width, height), Image.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(
+        buffer,
+        PIL_FORMATS[image_format],
+        quality=settings.IMAGE_THUMBNAIL_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def thumbnail_name(source, width, image_format):
+    """Возвращает имя копии изображения source заданной ширины и формата.
+
+    Имя зависит от исходного файла и всех параметров копии, поэтому
+    содержимое файла с таким именем не меняется.
+    """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    quality = settings.IMAGE_THUMBNAIL_QUALITY
+    return f"{THUMBNAILS_DIR}/{stem}_{width}_q{quality}.{image_format}"
+
+
+def _save_thumbnail(image, source, width, image_format, force):
+    name = thumbnail_name(source, width, image_format)
+    if force:
+        default_storage.delete(name)
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(
+        name, ContentFile(_render(image, width, image_format))
+    )
+
+
+def make_thumbnails(source, force=False):
+    """Создаёт уменьшенные копии изображения с именем source.
+
+    Возвращает словарь {"source": имя, формат: {ширина: имя копии}}.
+    Копии шире исходного изображения не создаются, но самая узкая
+    создаётся всегда. Уже существующие копии пересоздаются только при
+    force, так что одинаковые изображения разных рецептов обрабатываются
+    один раз.
+    """
+    with Recipe.image.field.storage.open(source) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert("RGB")
+
+    widths = sorted(settings.IMAGE_THUMBNAIL_WIDTHS)
+    widths = [widths[0]] + [
+        width for width in widths[1:] if width <= image.width
+    ]
+    thumbnails = {"source": source}
+    for image_format in settings.IMAGE_THUMBNAIL_FORMATS:
+        thumbnails[image_format] = {
+            str(width): _save_thumbnail(
+                image, source, width, image_format, force
+            )
+            for width in widths
+        }
+    return thumbnails
+
+
+def _is_recent(storage, name):
+    try:
+        modified = storage.get_modified_time(name)
+    except OSError:
+        return False
+    grace = timedelta(seconds=settings.MEDIA_ORPHAN_GRACE)
+    return timezone.now() - modified < grace
+
+
+def release_image(source, thumbnails=None):
+    """Удаляет изображение source, если на него не ссылаются рецепты.
+
+    Вместе с изображением удаляются его копии из словаря thumbnails.
+    Недавно сохранённые файлы не удаляются: они могут принадлежать
+    рецепту, транзакция которого ещё не зафиксирована. Такие файлы
+    удаляет команда cleanup_media.
+    """
+    storage = Recipe.image.field.storage
+    if (
+        not source
+        or Recipe.objects.filter(image=source).exists()
+        or _is_recent(storage, source)
+    ):
+        return
+    if thumbnails and thumbnails.get("source") == source:
+        for key, names in thumbnails.items():
+            if key != "source":
+                for name in names.values():
+                    default_storage.delete(name)
+    storage.delete(source)
+
+
+def process_recipe_image(recipe_id, force=False):
+    """Создаёт уменьшенные копии изображения рецепта recipe_id.
+
+    Уже созданные копии текущего изображения пересоздаются только при
+    force. Если за время обработки изображение рецепта сменилось,
+    результат не сохраняется: его заменит обработка нового изображения.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        "image", "thumbnails"
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+    source = recipe.image.name
+    if not force and recipe.thumbnails.get("source") == source:
+        return
+
+    thumbnails = make_thumbnails(source, force=force)
+    with transaction.atomic():
+        current = (
+            Recipe.objects.select_for_update()
+            .filter(pk=recipe_id, image=source)
+            .only("image", "thumbnails", "updated_at")
+            .first()
+        )
+        if current is None:
+            return
+        current.thumbnails = thumbnails
+        # Сохранение через save() отправляет post_save, по которому
+        # сбрасываются кэшированные ответы с этим рецептом.
+        current.save(update_fields=("thumbnails", "updated_at"))
+
+
+class ImageProcessor:
+    """Очередь обработки изображений в пуле фоновых потоков.
+
+    Пул создаётся при первой задаче. При IMAGE_PROCESSING_SYNC задачи
+    выполняются сразу в текущем потоке, что удобно для отладки и команд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                    thread_name_prefix="image-processor",
+                )
+            return self._executor
+
+    def _run(self, recipe_id):
+        try:
+            process_recipe_image(recipe_id)
+        except Exception:
+            logger.exception(
+                "Не удалось обработать изображение рецепта %s", recipe_id
+            )
+        finally:
+            close_old_connections()
+
+    def enqueue(self, recipe_id):
+        """Ставит обработку изображения рецепта в очередь после коммита."""
+        def submit():
+            if settings.IMAGE_PROCESSING_SYNC:
+                process_recipe_image(recipe_id)
+            else:
+                self._get_executor().submit(self._run, recipe_id)
+
+        transaction.on_commit(submit)
+
+
+image_processor = ImageProcessor()
@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.autocomplete import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время поиска ингредиентов по префиксу "
+        "в индексе автодополнения и в базе данных."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--prefix-length", type=int, default=2)
+
+    def handle(self, *args, **options):
+        length = options["prefix_length"]
+        prefixes = sorted(
+            {
+                name[:length]
+                for name in Ingredient.objects.values_list("name", flat=True)
+                if len(name) >= length
+            }
+        )
+        if not prefixes:
+            self.stdout.write("Нет ингредиентов для замера.")
+            return
+
+        limit = settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        ingredient_index.invalidate()
+        started = time.perf_counter()
+        ingredient_index.search("")
+        build_time = time.perf_counter() - started
+
+        def search_index(prefix):
+            ingredient_index.search(prefix, limit=limit)
+
+        def search_database(prefix):
+            list(
+                Ingredient.objects.filter(
+                    name__istartswith=prefix
+                ).values_list("id", flat=True)
+            )
+
+        self.stdout.write(
+            f"Префиксов: {len(prefixes)}, повторов: {options['repeat']}, "
+            f"построение индекса: {build_time * 1000:.2f} мс"
+        )
+        for label, search in (
+            ("index", search_index),
+            ("database", search_database),
+        ):
+            started = time.perf_counter()
+            for _ in range(options["repeat"]):
+                for prefix in prefixes:
+                    search(prefix)
+            elapsed = time.perf_counter() - started
+            per_query = elapsed / (options["repeat"] * len(prefixes))
+            self.stdout.write(f"{label}: {per_query * 1e6:.1f} мкс на запрос")
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет сохранённые списки покупок с содержимым корзин "
+        "и при необходимости исправляет расхождения."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Пересчитать списки пользователей с расхождениями.",
+        )
+
+    def handle(self, *args, **options):
+        expected = {
+            (row["user_id"], row["ingredient_id"]): row["total_amount"]
+            for row in ShoppingListItem.objects.calculate().iterator()
+        }
+        stored = {
+            (row["user_id"], row["ingredient_id"]): row["total_amount"]
+            for row in ShoppingListItem.objects.values(
+                "user_id", "ingredient_id", "total_amount"
+            ).iterator()
+        }
+
+        mismatches = [
+            (key, stored.get(key), expected.get(key))
+            for key in expected.keys() | stored.keys()
+            if stored.get(key) != expected.get(key)
+        ]
+        for (user_id, ingredient_id), actual, correct in sorted(
+            mismatches, key=lambda mismatch: mismatch[0]
+        ):
+            self.stdout.write(
+                f"user={user_id} ingredient={ingredient_id}: "
+                f"сохранено {actual}, ожидается {correct}"
+            )
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Расхождений не найдено."))
+            return
+
+        if not options["fix"]:
+            raise CommandError(f"Найдено расхождений: {len(mismatches)}.")
+
+        user_ids = {user_id for (user_id, _), _, _ in mismatches}
+        ingredient_ids = {
+            ingredient_id for (_, ingredient_id), _, _ in mismatches
+        }
+        ShoppingListItem.objects.refresh(user_ids, ingredient_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Исправлено расхождений: {len(mismatches)}.")
+        )
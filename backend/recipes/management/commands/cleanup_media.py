@@ -0,0 +1,67 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recipes.images import THUMBNAILS_DIR
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет изображения рецептов и их копии, на которые не ссылается "
+        "ни один рецепт."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать файлы, которые будут удалены.",
+        )
+
+    def handle(self, *args, **options):
+        images = set()
+        thumbnails = set()
+        for image, recipe_thumbnails in Recipe.objects.values_list(
+            "image", "thumbnails"
+        ).iterator():
+            images.add(image)
+            for key, names in recipe_thumbnails.items():
+                if key != "source":
+                    thumbnails.update(names.values())
+
+        upload_to = Recipe.image.field.upload_to
+        deleted = self.cleanup(
+            Recipe.image.field.storage, upload_to, images, options["dry_run"]
+        )
+        deleted += self.cleanup(
+            default_storage, THUMBNAILS_DIR, thumbnails, options["dry_run"]
+        )
+        if options["dry_run"]:
+            self.stdout.write(f"Будет удалено файлов: {deleted}")
+        else:
+            self.stdout.write(f"Удалено файлов: {deleted}")
+
+    def cleanup(self, storage, directory, referenced, dry_run):
+        if not storage.exists(directory):
+            return 0
+        deadline = timezone.now() - timedelta(
+            seconds=settings.MEDIA_ORPHAN_GRACE
+        )
+        deleted = 0
+        for file_name in storage.listdir(directory)[1]:
+            name = os.path.join(directory, file_name)
+            if (
+                name in referenced
+                or storage.get_modified_time(name) > deadline
+            ):
+                continue
+            if dry_run:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+            deleted += 1
+        return deleted
@@ -0,0 +1,52 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.models import RecipeTrend
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает рейтинг популярных в последнее время рецептов. "
+        "С параметром --interval работает как периодическая фоновая задача."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--half-life-hours",
+            type=float,
+            default=settings.TRENDING_HALF_LIFE_HOURS,
+        )
+        parser.add_argument(
+            "--window-days",
+            type=float,
+            default=settings.TRENDING_WINDOW_DAYS,
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=None,
+            help="Пересчитывать рейтинг каждые INTERVAL секунд.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.recompute(options)
+            if options["interval"] is None:
+                break
+            time.sleep(options["interval"])
+
+    def recompute(self, options):
+        started = time.perf_counter()
+        processed = RecipeTrend.objects.recompute(
+            weights=settings.TRENDING_WEIGHTS,
+            half_life=timedelta(hours=options["half_life_hours"]),
+            window=timedelta(days=options["window_days"]),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Рейтинг пересчитан: действий {processed}, "
+            f"рецептов {RecipeTrend.objects.count()}, "
+            f"{elapsed:.2f} с."
+        )
@@ -0,0 +1,86 @@
+import json
+import tarfile
+import time
+from tempfile import SpooledTemporaryFile
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.exporters import EXPORTERS
+from recipes.models import Recipe
+
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает ингредиенты, теги или рецепты в формате ndjson, "
+        "совместимом с командой import_data. С параметром --media рецепты "
+        "выгружаются в архив tar.gz вместе с изображениями."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(EXPORTERS))
+        parser.add_argument(
+            "path", help="Путь к файлу или - для вывода в stdout."
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--media",
+            action="store_true",
+            help="Выгрузить архив tar.gz с файлом ndjson и изображениями.",
+        )
+
+    def handle(self, *args, **options):
+        records = EXPORTERS[options["model"]](options["chunk_size"])
+        started = time.perf_counter()
+        if options["media"]:
+            if options["model"] != "recipes" or options["path"] == "-":
+                raise CommandError(
+                    "Архив с изображениями выгружается только для рецептов "
+                    "и только в файл."
+                )
+            images = set()
+            with SpooledTemporaryFile(max_size=SPOOL_SIZE) as buffer:
+                count = self.write_ndjson(records, buffer, images)
+                self.write_archive(options["path"], buffer, sorted(images))
+        elif options["path"] == "-":
+            count = self.write_ndjson(records, self.stdout)
+        else:
+            with open(options["path"], "w", encoding="utf-8") as file:
+                count = self.write_ndjson(records, file)
+
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            f"Выгружено записей: {count}, {count / elapsed:.0f} записей/с"
+        )
+
+    @staticmethod
+    def write_ndjson(records, file, images=None):
+        count = 0
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            file.write(line.encode() if "b" in file.mode else line)
+            if images is not None and record["image"]:
+                images.add(record["image"])
+            count += 1
+        return count
+
+    def write_archive(self, path, buffer, images):
+        info = tarfile.TarInfo("recipes.ndjson")
+        info.size = buffer.tell()
+        info.mtime = time.time()
+        buffer.seek(0)
+        with tarfile.open(path, "w:gz") as archive:
+            archive.addfile(info, buffer)
+            self.add_images(archive, images)
+
+    def add_images(self, archive, images):
+        storage = Recipe.image.field.storage
+        for name in images:
+            if not storage.exists(name):
+                self.stderr.write(f"Изображение не найдено: {name}")
+                continue
+            info = tarfile.TarInfo(f"media/{name}")
+            info.size = storage.size(name)
+            info.mtime = storage.get_modified_time(name).timestamp()
+            with storage.open(name) as image:
+                archive.addfile(info, image)
@@ -0,0 +1,289 @@
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from api.v1.cache import bump_versions
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from recipes.autocomplete import ingredient_index
+from recipes.counters import reconcile_all
+from recipes.models import (Follow, Ingredient, Profile, Recipe,
+                            RecipeActivity, RecipeIngredient, ShoppingListItem,
+                            Tag, TimelineEntry)
+
+User = get_user_model()
+
+PREFIX = "synthetic"
+PASSWORD = "synthetic-password"
+
+
+def zipf_weights(count, exponent):
+    """Возвращает накопленные веса распределения Ципфа для count элементов.
+
+    Чем больше exponent, тем сильнее популярность сосредоточена на первых
+    элементах.
+    """
+    return list(
+        accumulate(1 / rank**exponent for rank in range(1, count + 1))
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт синтетический набор пользователей, рецептов, подписок, "
+        "избранного и корзин заданного размера для нагрузочных замеров. "
+        "Популярность авторов и рецептов распределена по закону Ципфа."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--ingredients", type=int, default=0)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--follows-per-user", type=int, default=10)
+        parser.add_argument("--favorites-per-user", type=int, default=20)
+        parser.add_argument("--carts-per-user", type=int, default=5)
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.1,
+            help="Показатель распределения Ципфа для популярности.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.options = options
+        self.batch_size = options["batch_size"]
+        self.run = f"{PREFIX}{int(time.time())}"
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            ingredient_ids = self.get_ingredients(options["ingredients"])
+            tag_ids = self.get_tags()
+            user_ids = self.create_users(options["users"])
+            recipes = self.create_recipes(
+                options["recipes"], user_ids, ingredient_ids, tag_ids
+            )
+            self.create_follows(user_ids, recipes)
+            recipe_ids = [id for ids in recipes.values() for id in ids]
+            self.create_links(
+                Recipe.favorite.through,
+                RecipeActivity.Kind.FAVORITE,
+                user_ids,
+                recipe_ids,
+                options["favorites_per_user"],
+            )
+            self.create_links(
+                Recipe.cart.through,
+                RecipeActivity.Kind.CART,
+                user_ids,
+                recipe_ids,
+                options["carts_per_user"],
+            )
+
+        self.stdout.write("Пересчёт счётчиков и списков покупок...")
+        reconcile_all(Recipe, Profile, User, Follow)
+        ShoppingListItem.objects.rebuild(batch_size=self.batch_size)
+        bump_versions("recipes", "ingredients", "tags", "users")
+        ingredient_index.invalidate()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Данные созданы за {time.perf_counter() - started:.1f} с. "
+                f"Пароль пользователей: {PASSWORD}"
+            )
+        )
+
+    def choose(self, population, weights, count):
+        """Выбирает до count разных элементов с учётом популярности."""
+        count = min(count, len(population))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(
+                self.random.choices(
+                    population, cum_weights=weights, k=count - len(chosen)
+                )
+            )
+        return chosen
+
+    def get_ingredients(self, count):
+        if count or not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(
+                        name=f"{self.run} ингредиент {number}",
+                        measurement_unit=self.random.choice(("г", "мл", "шт")),
+                    )
+                    for number in range(count or 1000)
+                ),
+                batch_size=self.batch_size,
+            )
+        return list(Ingredient.objects.values_list("id", flat=True))
+
+    def get_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=label, slug=f"{self.run}-{value[1:]}", color=value)
+                for value, label in Tag.Color.choices
+            )
+        return list(Tag.objects.values_list("id", flat=True))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            (
+                User(
+                    username=f"{self.run}_{number}",
+                    email=f"{self.run}_{number}@example.com",
+                    first_name="Имя",
+                    last_name="Фамилия",
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        self.stdout.write(f"Пользователей: {len(users)}")
+        return [user.id for user in users]
+
+    def create_recipes(self, count, user_ids, ingredient_ids, tag_ids):
+        image = BytesIO()
+        Image.new("RGB", (640, 480), "orange").save(image, "JPEG")
+        image_name = Recipe.image.field.storage.save(
+            f"{Recipe.image.field.upload_to}/{self.run}.jpg",
+            ContentFile(image.getvalue()),
+        )
+
+        authors = self.random.choices(
+            user_ids, cum_weights=zipf_weights(len(user_ids), 1), k=count
+        )
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=author_id,
+                    name=f"{self.run} рецепт {number}",
+                    image=image_name,
+                    text="Синтетический рецепт для нагрузочных замеров.",
+                    cooking_time=self.random.randint(5, 180),
+                )
+                for number, author_id in enumerate(authors)
+            ),
+            batch_size=self.batch_size,
+        )
+        now = timezone.now()
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                minutes=self.random.randint(0, 365 * 24 * 60)
+            )
+        Recipe.objects.bulk_update(
+            recipes, ["pub_date"], batch_size=self.batch_size
+        )
+
+        per_recipe = self.options["ingredients_per_recipe"]
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient_id in self.random.sample(
+                    ingredient_ids, min(per_recipe, len(ingredient_ids))
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in self.random.sample(
+                    tag_ids, self.random.randint(1, len(tag_ids))
+                )
+            ),
+            batch_size=self.batch_size,
+        )
+        self.stdout.write(f"Рецептов: {len(recipes)}")
+
+        by_author = defaultdict(list)
+        for recipe in sorted(recipes, key=lambda recipe: recipe.pub_date):
+            by_author[recipe.author_id].append(recipe.id)
+        return by_author
+
+    def create_follows(self, user_ids, recipes):
+        authors = sorted(recipes, key=lambda id: -len(recipes[id]))
+        weights = zipf_weights(len(authors), self.options["skew"])
+        follows = [
+            (user_id, author_id)
+            for user_id in user_ids
+            for author_id in self.choose(
+                authors, weights, self.options["follows_per_user"]
+            )
+            if author_id != user_id
+        ]
+        Follow.objects.bulk_create(
+            (
+                Follow(user_id=user, author_id=author)
+                for user, author in follows
+            ),
+            batch_size=self.batch_size,
+        )
+
+        followers = defaultdict(int)
+        for _, author_id in follows:
+            followers[author_id] += 1
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(user_id=user_id, recipe_id=recipe_id)
+                for user_id, author_id in follows
+                if followers[author_id] <= settings.FEED_FANOUT_LIMIT
+                for recipe_id in recipes[author_id][
+                    -settings.FEED_BACKFILL_SIZE:
+                ]
+            ),
+            batch_size=self.batch_size,
+        )
+        self.stdout.write(f"Подписок: {len(follows)}")
+
+    def create_links(self, through, kind, user_ids, recipe_ids, per_user):
+        weights = zipf_weights(len(recipe_ids), self.options["skew"])
+        links = [
+            (user_id, recipe_id)
+            for user_id in user_ids
+            for recipe_id in self.choose(recipe_ids, weights, per_user)
+        ]
+        through.objects.bulk_create(
+            (
+                through(user_id=user, recipe_id=recipe)
+                for user, recipe in links
+            ),
+            batch_size=self.batch_size,
+        )
+        activities = RecipeActivity.objects.bulk_create(
+            (
+                RecipeActivity(user_id=user, recipe_id=recipe, kind=kind)
+                for user, recipe in links
+            ),
+            batch_size=self.batch_size,
+        )
+        now = timezone.now()
+        window = settings.TRENDING_WINDOW_DAYS * 24 * 60
+        for activity in activities:
+            activity.created_at = now - timedelta(
+                minutes=self.random.randint(0, window)
+            )
+        RecipeActivity.objects.bulk_update(
+            activities, ["created_at"], batch_size=self.batch_size
+        )
+        self.stdout.write(f"{kind.label}: {len(links)}")
@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+import os
+import tarfile
+import time
+from itertools import islice
+
+from api.v1.cache import bump_versions
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from recipes.autocomplete import ingredient_index
+from recipes.counters import reconcile_all
+from recipes.importers import IMPORTERS, READERS, read_ndjson
+from recipes.models import Follow, Profile, Recipe
+
+User = get_user_model()
+
+ARCHIVE_EXTENSIONS = (".tar", ".tar.gz", ".tgz")
+MEDIA_DIR = "media/"
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает ингредиенты, теги или рецепты из файла csv, json или "
+        "ndjson, а рецепты с изображениями - из архива команды export_data. "
+        "Уже существующие записи пропускаются. Прерванный импорт можно "
+        "продолжить с параметром --resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=sorted(IMPORTERS))
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Формат файла, по умолчанию определяется по расширению.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Продолжить импорт с последнего сохранённого пакета.",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY в PostgreSQL.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        is_archive = path.endswith(ARCHIVE_EXTENSIONS)
+        file_format = options["format"] or os.path.splitext(path)[1][1:]
+        if not is_archive and file_format not in READERS:
+            raise CommandError(f"Неизвестный формат файла: {path}")
+        if options["model"] == "recipes":
+            if file_format == "csv":
+                raise CommandError(
+                    "Рецепты загружаются только из json и ndjson."
+                )
+        elif is_archive:
+            raise CommandError("Из архива загружаются только рецепты.")
+
+        checkpoint = f"{path}.checkpoint"
+        skip = 0
+        if options["resume"] and os.path.exists(checkpoint):
+            with open(checkpoint) as file:
+                skip = json.load(file)["records"]
+            self.stdout.write(f"Продолжение импорта с записи {skip}.")
+
+        importer = IMPORTERS[options["model"]](
+            warn=self.stderr.write, use_copy=not options["no_copy"]
+        )
+        if is_archive:
+            with tarfile.open(path) as archive:
+                images = self.restore_media(archive)
+                file = io.TextIOWrapper(
+                    archive.extractfile("recipes.ndjson"), encoding="utf-8"
+                )
+                records = (
+                    {
+                        **record,
+                        "image": images.get(
+                            record.get("image"), record.get("image")
+                        ),
+                    }
+                    for record in read_ndjson(file, importer.fields)
+                )
+                processed, imported = self.import_records(
+                    importer, records, checkpoint, skip, options
+                )
+        else:
+            with open(path, encoding="utf-8", newline="") as file:
+                records = READERS[file_format](file, importer.fields)
+                processed, imported = self.import_records(
+                    importer, records, checkpoint, skip, options
+                )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.finish(options["model"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Импорт завершён, записей: {processed - skip}, "
+                f"добавлено: {imported}, "
+                f"пропущено: {processed - skip - imported}."
+            )
+        )
+
+    def import_records(self, importer, records, checkpoint, skip, options):
+        """Импортирует записи пакетами.
+
+        Возвращает номер последней обработанной записи и число добавленных
+        записей.
+        """
+        processed = skip
+        imported = 0
+        started = time.perf_counter()
+        try:
+            records = islice(records, skip, None)
+            while True:
+                batch = list(islice(records, options["batch_size"]))
+                if not batch:
+                    break
+                imported += importer.import_batch(batch)
+                processed += len(batch)
+                self.save_checkpoint(checkpoint, processed)
+                self.report(processed - skip, started)
+        except (ValueError, csv.Error) as error:
+            raise CommandError(
+                f"Ошибка чтения после записи {processed}: {error}"
+            )
+        return processed, imported
+
+    def restore_media(self, archive):
+        """Сохраняет изображения из архива в хранилище.
+
+        Возвращает соответствие имён изображений в архиве и в хранилище:
+        хранилище называет файлы по содержимому, поэтому имена могут
+        отличаться.
+        """
+        storage = Recipe.image.field.storage
+        images = {}
+        for member in archive:
+            if not member.isfile() or not member.name.startswith(MEDIA_DIR):
+                continue
+            name = member.name[len(MEDIA_DIR):]
+            with archive.extractfile(member) as content:
+                images[name] = storage.save(name, File(content, name=name))
+        self.stdout.write(f"Восстановлено изображений: {len(images)}")
+        return images
+
+    @staticmethod
+    def save_checkpoint(checkpoint, processed):
+        with open(f"{checkpoint}.tmp", "w") as file:
+            json.dump({"records": processed}, file)
+        os.replace(f"{checkpoint}.tmp", checkpoint)
+
+    def report(self, processed, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Обработано записей: {processed}, "
+            f"{processed / elapsed:.0f} записей/с"
+        )
+
+    def finish(self, model):
+        # bulk_create не отправляет сигналы, поэтому кэши и счётчики,
+        # которые обычно обновляют обработчики сигналов, обновляются здесь.
+        # Ленты подписчиков и копии изображений новых рецептов
+        # RecipeImporter обновляет после каждого пакета.
+        if model == "recipes":
+            reconcile_all(Recipe, Profile, User, Follow)
+            bump_versions("recipes", "ingredients")
+            ingredient_index.invalidate()
+        elif model == "ingredients":
+            bump_versions("ingredients")
+            ingredient_index.invalidate()
+        elif model == "tags":
+            bump_versions("tags")
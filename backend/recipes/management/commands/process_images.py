@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт уменьшенные копии изображений рецептов, для которых они "
+        "ещё не созданы или устарели."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать копии для всех рецептов.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="").only("image", "thumbnails")
+        processed = 0
+        for recipe in recipes.iterator():
+            if (
+                not options["force"]
+                and recipe.thumbnails.get("source") == recipe.image.name
+            ):
+                continue
+            process_recipe_image(recipe.pk, force=options["force"])
+            processed += 1
+        self.stdout.write(f"Обработано изображений: {processed}")
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from recipes.counters import reconcile_all
+from recipes.models import Follow, Profile, Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет счётчики избранного, корзин, рецептов и подписчиков "
+        "с фактическими данными и исправляет расхождения."
+    )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_all(Recipe, Profile, User, Follow)
+        for field, count in fixed.items():
+            self.stdout.write(f"{field}: исправлено строк {count}")
+        self.stdout.write(self.style.SUCCESS("Счётчики сверены."))
@@ -0,0 +1,50 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+FORWARD_SQL = (
+    """
+    ALTER TABLE recipes_recipe
+    ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX recipe_search_vector_idx
+    ON recipes_recipe USING gin (search_vector)
+    """,
+    """
+    CREATE INDEX recipe_name_trgm_idx
+    ON recipes_recipe USING gin (name gin_trgm_ops)
+    """,
+)
+
+REVERSE_SQL = (
+    "DROP INDEX IF EXISTS recipe_name_trgm_idx",
+    "DROP INDEX IF EXISTS recipe_search_vector_idx",
+    "ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def run_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_shoppinglistitem"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(
+            run_postgresql(FORWARD_SQL), run_postgresql(REVERSE_SQL)
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.1.3 on 2026-10-18 06:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from recipes.counters import reconcile_all
+
+
+def fill_counters(apps, schema_editor):
+    reconcile_all(
+        apps.get_model("recipes", "Recipe"),
+        apps.get_model("recipes", "Profile"),
+        apps.get_model(settings.AUTH_USER_MODEL),
+        apps.get_model("recipes", "Follow"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0005_recipe_pub_date_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Profile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "recipes_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число рецептов"
+                    ),
+                ),
+                (
+                    "followers_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число подписчиков"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Профиль",
+                "verbose_name_plural": "Профили",
+                "ordering": ("id",),
+            },
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="carts_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число добавлений в корзину"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число добавлений в избранное"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-favorites_count", "-pub_date", "-id"],
+                name="recipe_popularity_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="user",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="profile",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Пользователь",
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_timeline"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Уменьшенные копии изображения",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 06:14
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_recipe_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                storage=recipes.storage.ContentAddressedStorage(),
+                upload_to="recipes/images",
+                verbose_name="Изображение",
+            ),
+        ),
+    ]
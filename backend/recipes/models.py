@@ -1,7 +1,21 @@
 """Модуль содержит основные модели проекта."""
+from collections import defaultdict
+from itertools import islice
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField,
+                                            TrigramSimilarity)
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import (Case, Exists, F, OuterRef, Prefetch, Q, Sum,
+                              Value, When)
+from django.db.models.expressions import RawSQL, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .storage import ContentAddressedStorage
+from .utils import normalize
 
 User = get_user_model()
 
@@ -87,6 +101,155 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """QuerySet модели Recipe."""
+
+    def with_user_data(self, user):
+        """Подгружает связанные данные рецептов для пользователя user.
+
+        Признаки is_favorited, is_in_shopping_cart и is_subscribed автора
+        вычисляются подзапросами Exists, а теги и авторы загружаются
+        отдельными запросами на всю выборку вместе с ингредиентами,
+        поэтому число запросов не зависит от количества рецептов.
+        """
+        authors = User.objects.all()
+        if user.is_authenticated:
+            queryset = self.annotate(
+                is_favorited=Exists(
+                    Recipe.favorite.through.objects.filter(
+                        recipe=OuterRef("pk"), user=user
+                    )
+                ),
+                is_in_shopping_cart=Exists(
+                    Recipe.cart.through.objects.filter(
+                        recipe=OuterRef("pk"), user=user
+                    )
+                ),
+            )
+            authors = authors.annotate(
+                is_subscribed=Exists(
+                    Follow.objects.filter(author=OuterRef("pk"), user=user)
+                )
+            )
+        else:
+            queryset = self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+            authors = authors.annotate(is_subscribed=Value(False))
+
+        return queryset.prefetch_related(
+            "tags",
+            Prefetch("author", queryset=authors),
+            Prefetch(
+                "recipes_ingredients",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ).order_by("ingredient_id"),
+            ),
+        )
+
+    def latest_by_author(self, authors, limit=None):
+        """Возвращает не более limit последних рецептов каждого автора.
+
+        Рецепты всех авторов выбираются одним запросом с оконной функцией
+        ROW_NUMBER() OVER (PARTITION BY author_id).
+        """
+        recipes = self.filter(author__in=authors)
+        if limit is None:
+            return list(recipes)
+
+        ranked = recipes.annotate(
+            author_rank=Window(
+                RowNumber(),
+                partition_by=F("author_id"),
+                order_by=(F("pub_date").desc(), F("id").desc()),
+            )
+        )
+        sql, params = ranked.query.sql_with_params()
+        return list(
+            self.raw(
+                f"SELECT * FROM ({sql}) ranked "
+                f"WHERE author_rank <= %s "
+                f"ORDER BY pub_date DESC, id DESC",
+                (*params, limit),
+            )
+        )
+
+    def feed(self, user, fanout_limit):
+        """Возвращает ленту рецептов авторов, на которых подписан user.
+
+        Рецепты обычных авторов берутся из записей TimelineEntry, созданных
+        при публикации. Рецепты авторов, у которых больше fanout_limit
+        подписчиков, в ленты не копируются и выбираются напрямую.
+        """
+        large_authors = Follow.objects.filter(
+            user=user, author__profile__followers_count__gt=fanout_limit
+        ).values("author")
+        timeline = TimelineEntry.objects.filter(user=user).values("recipe")
+        return self.filter(Q(id__in=timeline) | Q(author__in=large_authors))
+
+    def search(self, query):
+        """Ищет рецепты по названию и описанию.
+
+        В PostgreSQL используется полнотекстовый поиск по столбцу
+        search_vector и триграммное сходство названий, оба с GIN-индексами.
+        Для остальных СУБД поиск выполняется на стороне Python.
+        """
+        if not query.strip():
+            return self
+        if self.db_vendor == "postgresql":
+            return self._search_postgresql(query)
+        return self._search_python(query)
+
+    @property
+    def db_vendor(self):
+        return connections[self.db].vendor
+
+    def _search_postgresql(self, query):
+        vector = RawSQL(
+            f'"{Recipe._meta.db_table}"."search_vector"',
+            [],
+            output_field=SearchVectorField(),
+        )
+        search_query = SearchQuery(
+            query, config="russian", search_type="websearch"
+        )
+        return (
+            self.alias(search_vector=vector)
+            .annotate(
+                rank=(
+                    SearchRank(vector, search_query)
+                    + TrigramSimilarity("name", query)
+                ),
+            )
+            .filter(
+                Q(search_vector=search_query)
+                | Q(name__trigram_similar=query)
+            )
+            .order_by("-rank", "-pub_date")
+        )
+
+    def _search_python(self, query):
+        terms = normalize(query).split()
+        ranks = {}
+        recipes = self.prefetch_related(None).values_list("id", "name", "text")
+        for id, name, text in recipes.iterator():
+            name, text = normalize(name), normalize(text)
+            if all(term in name or term in text for term in terms):
+                ranks[id] = sum(
+                    2 * (term in name) + (term in text) for term in terms
+                )
+
+        if not ranks:
+            return self.none()
+        return self.filter(id__in=ranks).order_by(
+            Case(*(When(id=id, then=rank) for id, rank in ranks.items()))
+            .desc(),
+            "-pub_date",
+        )
+
+
 class Recipe(models.Model):
     """Модель Recipe.
 
@@ -114,8 +277,15 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to="recipes/images",
+        storage=ContentAddressedStorage(),
         verbose_name="Изображение",
     )
+    thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Уменьшенные копии изображения",
+    )
     text = models.TextField(
         verbose_name="Описание",
     )
@@ -132,6 +302,10 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name="Дата публикации",
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
     favorite = models.ManyToManyField(
         User,
         related_name="favorites",
@@ -143,12 +317,35 @@ class Recipe(models.Model):
         verbose_name="В корзине у пользователей",
     )
 
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Число добавлений в избранное",
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Число добавлений в корзину",
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         """Meta опции модели RecipeIngredient."""
 
-        ordering = ("-pub_date",)
+        ordering = ("-pub_date", "-id")
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="recipe_pub_date_id_idx",
+            ),
+            models.Index(
+                fields=["-favorites_count", "-pub_date", "-id"],
+                name="recipe_popularity_idx",
+            ),
+        ]
 
     def __str__(self):
         """Строковое представление модели Recipe."""
@@ -241,3 +438,357 @@ class Follow(models.Model):
                 name="unique follow",
             )
         ]
+
+
+class Profile(models.Model):
+    """Модель Profile.
+
+    Хранит счётчики пользователя, которые иначе пришлось бы вычислять
+    агрегацией при каждом запросе. Счётчики обновляются обработчиками
+    сигналов, а сверить их с данными можно командой reconcile_counters.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="profile",
+        verbose_name="Пользователь",
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число рецептов",
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Число подписчиков",
+    )
+
+    class Meta:
+        """Meta опции модели Profile."""
+
+        ordering = ("id",)
+        verbose_name = "Профиль"
+        verbose_name_plural = "Профили"
+
+    def __str__(self):
+        """Строковое представление модели Profile."""
+        return f"Профиль пользователя {self.user}"
+
+
+class RecipeActivity(models.Model):
+    """Модель RecipeActivity.
+
+    Журнал добавлений рецептов в избранное и в корзину, по которому
+    вычисляется рейтинг популярных в последнее время рецептов.
+    """
+
+    class Kind(models.TextChoices):
+        """Enum-класс Kind перечисляет виды действий с рецептом."""
+
+        FAVORITE = "favorite", "Избранное"
+        CART = "cart", "Корзина"
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="activities",
+        verbose_name="Рецепт",
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="activities",
+        verbose_name="Пользователь",
+    )
+    kind = models.CharField(
+        max_length=16,
+        choices=Kind.choices,
+        verbose_name="Действие",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name="Дата",
+    )
+
+    class Meta:
+        """Meta опции модели RecipeActivity."""
+
+        ordering = ("-id",)
+        verbose_name = "Действие с рецептом"
+        verbose_name_plural = "Действия с рецептами"
+
+    def __str__(self):
+        """Строковое представление модели RecipeActivity."""
+        return f"{self.user}: {self.get_kind_display()} - {self.recipe}"
+
+
+class RecipeTrendQuerySet(models.QuerySet):
+    """QuerySet модели RecipeTrend."""
+
+    def recompute(self, weights, half_life, window, now=None):
+        """Пересчитывает рейтинг по журналу действий.
+
+        Вклад каждого действия равен весу его вида, уменьшающемуся вдвое
+        за каждые half_life. Учитываются действия за период window, более
+        старые действия в рейтинг не попадают и удаляются из журнала.
+        Возвращает число обработанных действий.
+        """
+        now = now or timezone.now()
+        RecipeActivity.objects.filter(created_at__lt=now - window).delete()
+        scores = defaultdict(float)
+        processed = 0
+        activities = RecipeActivity.objects.values_list(
+            "recipe_id", "kind", "created_at"
+        )
+        for recipe_id, kind, created_at in activities.iterator():
+            age = (now - created_at) / half_life
+            scores[recipe_id] += weights.get(kind, 0) * 0.5**age
+            processed += 1
+
+        with transaction.atomic():
+            RecipeTrend.objects.all().delete()
+            RecipeTrend.objects.bulk_create(
+                (
+                    RecipeTrend(recipe_id=id, score=score, computed_at=now)
+                    for id, score in scores.items()
+                ),
+                batch_size=1000,
+            )
+        return processed
+
+
+class RecipeTrend(models.Model):
+    """Модель RecipeTrend.
+
+    Заранее вычисленный рейтинг рецептов, популярных в последнее время.
+    Таблица пересчитывается периодически командой compute_trending.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trend",
+        verbose_name="Рецепт",
+    )
+    score = models.FloatField(
+        db_index=True,
+        verbose_name="Рейтинг",
+    )
+    computed_at = models.DateTimeField(
+        verbose_name="Дата расчёта",
+    )
+
+    objects = RecipeTrendQuerySet.as_manager()
+
+    class Meta:
+        """Meta опции модели RecipeTrend."""
+
+        ordering = ("-score",)
+        verbose_name = "Рейтинг рецепта"
+        verbose_name_plural = "Рейтинг рецептов"
+
+    def __str__(self):
+        """Строковое представление модели RecipeTrend."""
+        return f"{self.recipe}: {self.score:.2f}"
+
+
+class TimelineEntryQuerySet(models.QuerySet):
+    """QuerySet модели TimelineEntry."""
+
+    def _create_in_batches(self, entries, batch_size):
+        while True:
+            batch = list(islice(entries, batch_size))
+            if not batch:
+                break
+            self.bulk_create(batch, ignore_conflicts=True)
+
+    def fan_out(self, recipe, batch_size=1000):
+        """Добавляет рецепт recipe в ленты всех подписчиков его автора."""
+        followers = Follow.objects.filter(author=recipe.author_id)
+        entries = (
+            TimelineEntry(user_id=user_id, recipe_id=recipe.pk)
+            for user_id in followers.values_list("user_id", flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+        self._create_in_batches(entries, batch_size)
+
+    def backfill_followers(self, author, limit, batch_size=1000):
+        """Добавляет последние limit рецептов author в ленты подписчиков."""
+        recipe_ids = list(
+            Recipe.objects.filter(author=author).values_list(
+                "id", flat=True
+            )[:limit]
+        )
+        followers = Follow.objects.filter(author=author)
+        entries = (
+            TimelineEntry(user_id=user_id, recipe_id=recipe_id)
+            for user_id in followers.values_list("user_id", flat=True)
+            .iterator(chunk_size=batch_size)
+            for recipe_id in recipe_ids
+        )
+        self._create_in_batches(entries, batch_size)
+
+    def backfill(self, user, author, limit):
+        """Добавляет в ленту user последние limit рецептов автора author."""
+        recipes = Recipe.objects.filter(author=author).values_list(
+            "id", flat=True
+        )[:limit]
+        self.bulk_create(
+            (
+                TimelineEntry(user_id=user.pk, recipe_id=recipe_id)
+                for recipe_id in recipes
+            ),
+            ignore_conflicts=True,
+        )
+
+
+class TimelineEntry(models.Model):
+    """Модель TimelineEntry.
+
+    Запись ленты подписок: рецепт recipe показывается пользователю user.
+    Записи создаются при публикации рецепта для всех подписчиков автора,
+    кроме авторов с очень большим числом подписчиков, рецепты которых
+    добавляются в ленту при её чтении.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Пользователь",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Рецепт",
+    )
+
+    objects = TimelineEntryQuerySet.as_manager()
+
+    class Meta:
+        """Meta опции модели TimelineEntry."""
+
+        ordering = ("-id",)
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"],
+                name="unique timeline entry",
+            )
+        ]
+
+    def __str__(self):
+        """Строковое представление модели TimelineEntry."""
+        return f"{self.user}: {self.recipe}"
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    """QuerySet модели ShoppingListItem."""
+
+    @staticmethod
+    def calculate(**filters):
+        """Считает суммарное количество ингредиентов в корзинах."""
+        return (
+            RecipeIngredient.objects.filter(
+                recipe__cart__isnull=False, **filters
+            )
+            .values("ingredient_id", user_id=F("recipe__cart"))
+            .annotate(total_amount=Sum("amount"))
+            .order_by()
+        )
+
+    def refresh(self, user_ids, ingredient_ids):
+        """Пересчитывает строки списков покупок.
+
+        Затрагиваются только пары пользователь-ингредиент из user_ids и
+        ingredient_ids, остальные строки не изменяются. Пересчёты списков
+        одного пользователя выполняются по очереди: строки пользователей
+        блокируются до конца транзакции, иначе параллельные транзакции
+        вставили бы одни и те же строки и нарушили уникальность.
+        """
+        user_ids, ingredient_ids = list(user_ids), list(ingredient_ids)
+        if not user_ids or not ingredient_ids:
+            return
+
+        with transaction.atomic():
+            # Блокировки берутся в порядке id, чтобы избежать взаимных.
+            list(
+                User.objects.select_for_update()
+                .filter(id__in=user_ids)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            ShoppingListItem.objects.filter(
+                user__in=user_ids,
+                ingredient__in=ingredient_ids,
+            ).delete()
+            ShoppingListItem.objects.bulk_create(
+                ShoppingListItem(**row)
+                for row in self.calculate(
+                    recipe__cart__in=user_ids,
+                    ingredient__in=ingredient_ids,
+                )
+            )
+
+    def rebuild(self, batch_size=1000):
+        """Строит списки покупок всех пользователей заново."""
+        with transaction.atomic():
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                (ShoppingListItem(**row) for row in self.calculate()),
+                batch_size=batch_size,
+            )
+
+
+class ShoppingListItem(models.Model):
+    """Модель ShoppingListItem.
+
+    Хранит суммарное количество ингредиента во всех рецептах из корзины
+    пользователя, чтобы список покупок не приходилось пересчитывать при
+    каждом скачивании. Строки обновляются при изменении корзины, удалении
+    рецепта и изменении его ингредиентов. Код, меняющий эти данные в обход
+    моделей и API, должен вызывать ShoppingListItem.objects.refresh.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+        verbose_name="Ингридиент",
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name="Количество",
+    )
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        """Meta опции модели ShoppingListItem."""
+
+        ordering = ("id",)
+        verbose_name = "Позиция списка покупок"
+        verbose_name_plural = "Списки покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique shopping list item",
+            )
+        ]
+
+    def __str__(self):
+        """Строковое представление модели ShoppingListItem."""
+        return (
+            f"Пользователь: {self.user}, "
+            f"Ингредиент: {self.ingredient}, "
+            f"Количество: {self.total_amount}"
+        )
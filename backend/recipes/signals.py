@@ -0,0 +1,324 @@
+"""Модуль содержит обработчики сигналов моделей приложения recipes."""
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .autocomplete import ingredient_index
+from .images import image_processor, release_image
+from .metadata import strip_metadata
+from .models import (Follow, Ingredient, Profile, Recipe, RecipeActivity,
+                     RecipeIngredient, ShoppingListItem, TimelineEntry)
+
+User = get_user_model()
+
+RECIPE_COUNTERS = {
+    Recipe.favorite.through: "favorites_count",
+    Recipe.cart.through: "carts_count",
+}
+
+ACTIVITY_KINDS = {
+    Recipe.favorite.through: RecipeActivity.Kind.FAVORITE,
+    Recipe.cart.through: RecipeActivity.Kind.CART,
+}
+
+
+def _get_ingredient_ids(recipe_ids):
+    return RecipeIngredient.objects.filter(
+        recipe__in=recipe_ids,
+    ).values_list("ingredient_id", flat=True)
+
+
+@receiver(m2m_changed, sender=Recipe.cart.through)
+def update_shopping_list(sender, instance, action, reverse, pk_set, **kwargs):
+    """Обновляет списки покупок при изменении корзин."""
+    if action in ("post_add", "post_remove"):
+        if reverse:
+            ShoppingListItem.objects.refresh(
+                [instance.pk], _get_ingredient_ids(pk_set)
+            )
+        else:
+            ShoppingListItem.objects.refresh(
+                pk_set, _get_ingredient_ids([instance.pk])
+            )
+    elif action == "pre_clear" and not reverse:
+        instance.cleared_cart_users = list(
+            instance.cart.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        if reverse:
+            ShoppingListItem.objects.filter(user=instance).delete()
+        else:
+            ShoppingListItem.objects.refresh(
+                instance.cleared_cart_users,
+                _get_ingredient_ids([instance.pk]),
+            )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_shopping_list_scope(sender, instance, **kwargs):
+    """Запоминает списки покупок, которые затронет удаление рецепта."""
+    instance.shopping_list_scope = (
+        list(instance.cart.values_list("id", flat=True)),
+        list(_get_ingredient_ids([instance.pk])),
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def refresh_shopping_list_scope(sender, instance, **kwargs):
+    """Обновляет списки покупок после удаления рецепта."""
+    ShoppingListItem.objects.refresh(*instance.shopping_list_scope)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    """Сбрасывает индекс автодополнения при изменении ингредиентов."""
+    ingredient_index.invalidate()
+
+
+def _change_counters(field, deltas):
+    """Атомарно изменяет счётчик field рецептов на величины из deltas."""
+    by_delta = {}
+    for pk, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(pk)
+    for delta, pks in by_delta.items():
+        Recipe.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+
+
+@receiver(m2m_changed, sender=Recipe.favorite.through)
+@receiver(m2m_changed, sender=Recipe.cart.through)
+def update_recipe_counters(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Обновляет счётчики избранного и корзин у рецептов."""
+    field = RECIPE_COUNTERS[sender]
+    if action in ("pre_remove", "pre_clear"):
+        # pk_set при удалении может содержать отсутствующие связи,
+        # поэтому запоминаются только действительно удаляемые.
+        links = sender.objects.filter(
+            **{"user" if reverse else "recipe": instance}
+        )
+        if action == "pre_remove":
+            links = links.filter(
+                **{"recipe__in" if reverse else "user__in": pk_set}
+            )
+        instance.removed_counter_links = Counter(
+            links.values_list("recipe_id", flat=True)
+        )
+    elif action == "post_add" and pk_set:
+        if reverse:
+            _change_counters(field, {pk: 1 for pk in pk_set})
+        else:
+            _change_counters(field, {instance.pk: len(pk_set)})
+    elif action in ("post_remove", "post_clear"):
+        _change_counters(
+            field,
+            {
+                pk: -count
+                for pk, count in instance.removed_counter_links.items()
+            },
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.favorite.through)
+@receiver(m2m_changed, sender=Recipe.cart.through)
+def log_recipe_activity(sender, instance, action, reverse, pk_set, **kwargs):
+    """Записывает добавления рецептов в избранное и корзину в журнал.
+
+    При удалении рецепта из избранного или корзины соответствующие
+    записи журнала удаляются, чтобы они не влияли на рейтинг.
+    """
+    kind = ACTIVITY_KINDS[sender]
+    if action == "post_add" and pk_set:
+        if reverse:
+            links = [(instance.pk, pk) for pk in pk_set]
+        else:
+            links = [(pk, instance.pk) for pk in pk_set]
+        RecipeActivity.objects.bulk_create(
+            RecipeActivity(user_id=user_id, recipe_id=recipe_id, kind=kind)
+            for user_id, recipe_id in links
+        )
+    elif action in ("post_remove", "post_clear"):
+        activities = RecipeActivity.objects.filter(
+            kind=kind, **{"user" if reverse else "recipe": instance}
+        )
+        if action == "post_remove":
+            activities = activities.filter(
+                **{"recipe__in" if reverse else "user__in": pk_set}
+            )
+        activities.delete()
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, **kwargs):
+    """Создаёт профиль нового пользователя."""
+    if created:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(pre_delete, sender=User)
+def release_user_counters(sender, instance, **kwargs):
+    """Уменьшает счётчики рецептов из избранного и корзины пользователя.
+
+    Связи удаляются каскадно без сигнала m2m_changed.
+    """
+    for field, recipes in (
+        ("favorites_count", instance.favorites),
+        ("carts_count", instance.carts),
+    ):
+        _change_counters(
+            field, {pk: -1 for pk in recipes.values_list("id", flat=True)}
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик рецептов автора."""
+    if created:
+        Profile.objects.filter(user=instance.author_id).update(
+            recipes_count=F("recipes_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """Уменьшает счётчик рецептов автора."""
+    Profile.objects.filter(user=instance.author_id).update(
+        recipes_count=F("recipes_count") - 1
+    )
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик подписчиков автора."""
+    if created:
+        Profile.objects.filter(user=instance.author_id).update(
+            followers_count=F("followers_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(sender, instance, **kwargs):
+    """Уменьшает счётчик подписчиков автора."""
+    Profile.objects.filter(user=instance.author_id).update(
+        followers_count=F("followers_count") - 1
+    )
+
+
+def _is_fanout_author(author_id):
+    return Profile.objects.filter(
+        user=author_id,
+        followers_count__lte=settings.FEED_FANOUT_LIMIT,
+    ).exists()
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    """Добавляет новый рецепт в ленты подписчиков автора.
+
+    Рецепты авторов с числом подписчиков больше FEED_FANOUT_LIMIT
+    добавляются в ленту при её чтении.
+    """
+    if created and _is_fanout_author(instance.author_id):
+        TimelineEntry.objects.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """Добавляет в ленту нового подписчика последние рецепты автора."""
+    if created and _is_fanout_author(instance.author_id):
+        TimelineEntry.objects.backfill(
+            instance.user, instance.author, settings.FEED_BACKFILL_SIZE
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    """Удаляет рецепты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user=instance.user_id, recipe__author=instance.author_id
+    ).delete()
+
+
+@receiver(post_delete, sender=Follow)
+def backfill_follower_timelines(sender, instance, **kwargs):
+    """Заполняет ленты подписчиков автора, снова ставшего обычным.
+
+    Пока у автора больше FEED_FANOUT_LIMIT подписчиков, его новые рецепты
+    в ленты не копируются. Когда число подписчиков опускается до
+    FEED_FANOUT_LIMIT, его последние рецепты добавляются в ленты всех
+    оставшихся подписчиков. При обратном переходе ничего делать не нужно:
+    рецепты такого автора выбираются при чтении ленты.
+    """
+    crossed = Profile.objects.filter(
+        user=instance.author_id,
+        followers_count=settings.FEED_FANOUT_LIMIT,
+    ).exists()
+    if crossed:
+        # После фиксации, чтобы не добавлять записи для рецептов, которые
+        # удаляются вместе с автором в этой же транзакции.
+        transaction.on_commit(
+            lambda: TimelineEntry.objects.backfill_followers(
+                instance.author_id, settings.FEED_BACKFILL_SIZE
+            )
+        )
+
+
+@receiver(pre_save, sender=Recipe)
+def strip_image_metadata(sender, instance, raw, **kwargs):
+    """Удаляет метаданные из нового изображения рецепта до сохранения."""
+    image = instance.image
+    if raw or not image or image._committed:
+        return
+    stripped = strip_metadata(image.file)
+    if stripped is not None:
+        instance.image = File(stripped, name=image.name)
+
+
+@receiver(post_save, sender=Recipe)
+def enqueue_image_processing(sender, instance, raw, **kwargs):
+    """Ставит в очередь создание копий нового изображения рецепта.
+
+    Для рецептов из фикстур копии создаются командой process_images,
+    когда файлы изображений уже скопированы.
+    """
+    if raw:
+        return
+    if instance.image and (
+        instance.thumbnails.get("source") != instance.image.name
+    ):
+        image_processor.enqueue(instance.pk)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_previous_image(sender, instance, update_fields, **kwargs):
+    """Запоминает изображение рецепта до сохранения."""
+    if instance.pk and (update_fields is None or "image" in update_fields):
+        instance.previous_image = (
+            Recipe.objects.filter(pk=instance.pk)
+            .values_list("image", "thumbnails")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def release_previous_image(sender, instance, **kwargs):
+    """Удаляет заменённое изображение рецепта, если оно больше не нужно."""
+    previous = getattr(instance, "previous_image", None)
+    instance.previous_image = None
+    if previous and previous[0] != instance.image.name:
+        transaction.on_commit(lambda: release_image(*previous))
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    """Удаляет изображение удалённого рецепта, если оно больше не нужно."""
+    source, thumbnails = instance.image.name, instance.thumbnails
+    transaction.on_commit(lambda: release_image(source, thumbnails))
@@ -0,0 +1,46 @@
+"""Модуль содержит хранилище файлов, адресуемых по содержимому.
+
+Файл сохраняется под именем, равным SHA-256 его содержимого, поэтому
+одинаковые изображения хранятся в одном экземпляре, а содержимое файла с
+данным именем никогда не меняется и может кэшироваться бессрочно.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def compute_hash(content):
+    """Возвращает SHA-256 содержимого файла content."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, именующее файлы по их содержимому.
+
+    Хэш берётся из атрибута sha256 файла, если его уже вычислили при
+    загрузке, иначе вычисляется при сохранении. Если файл с таким
+    содержимым уже есть, он не перезаписывается, а только обновляется время
+    его изменения, чтобы очистка не удалила его до сохранения рецепта.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        digest = getattr(content, "sha256", None) or compute_hash(content)
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        name = os.path.join(directory, f"{digest}{extension}")
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from recipes.autocomplete import IngredientIndex, ingredient_index
+from recipes.models import Ingredient
+
+
+class IngredientIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = {
+            name: Ingredient.objects.create(name=name, measurement_unit="г")
+            for name in ("Свёкла", "Сахар", "Свекольный сок", "Кислая свекла")
+        }
+
+    def setUp(self):
+        self.index = IngredientIndex()
+
+    def search(self, query):
+        return [
+            Ingredient.objects.get(id=id).name
+            for id in self.index.search(query)
+        ]
+
+    def test_prefix_matches_come_first(self):
+        self.assertEqual(
+            self.search("свек"),
+            ["Свёкла", "Свекольный сок", "Кислая свекла"],
+        )
+        self.assertEqual(len(self.index.search("с", limit=2)), 2)
+
+    def test_query_is_normalized(self):
+        for query in ("СВЁК", " свёк ", "Свек"):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.search(query),
+                    ["Свёкла", "Свекольный сок", "Кислая свекла"],
+                )
+
+    def test_index_is_built_once(self):
+        with self.assertNumQueries(1):
+            self.index.search("са")
+            self.index.search("све")
+
+    def test_invalidate_rebuilds_index(self):
+        self.index.search("са")
+        Ingredient.objects.create(name="Сало", measurement_unit="г")
+        self.assertEqual(self.search("сал"), [])
+
+        self.index.invalidate()
+        self.assertEqual(self.search("сал"), ["Сало"])
+
+    def test_changes_invalidate_shared_index(self):
+        ingredient_index.invalidate()
+        ingredient_index.search("са")
+        sugar = self.ingredients["Сахар"]
+        sugar.name = "Сахарная пудра"
+        sugar.save()
+        self.assertEqual(ingredient_index.search("сахарн"), [sugar.id])
+
+        sugar.delete()
+        self.assertEqual(ingredient_index.search("сахар"), [])
+
+    def test_index_built_before_invalidation_is_discarded(self):
+        values_list = Ingredient.objects.values_list
+
+        def invalidate_during_build(*args):
+            # Ингредиенты изменились, пока строился индекс.
+            self.index.invalidate()
+            return values_list(*args)
+
+        with mock.patch.object(
+            Ingredient.objects, "values_list", invalidate_during_build
+        ):
+            self.index.search("са")
+        with self.assertNumQueries(1):
+            self.index.search("са")
+
+    @override_settings(INGREDIENT_INDEX_TTL=10)
+    def test_index_expires(self):
+        with mock.patch("recipes.autocomplete.time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            self.index.search("са")
+            monotonic.return_value = 105
+            with self.assertNumQueries(0):
+                self.index.search("са")
+            monotonic.return_value = 111
+            with self.assertNumQueries(1):
+                self.index.search("са")
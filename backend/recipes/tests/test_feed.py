@@ -0,0 +1,33 @@
+from django.test import TestCase, override_settings
+from recipes.models import Follow, Recipe, TimelineEntry
+
+from .utils import create_recipe, create_user
+
+
+@override_settings(FEED_FANOUT_LIMIT=1)
+class FeedFanoutThresholdTest(TestCase):
+    def setUp(self):
+        self.author, self.reader, self.other = (
+            create_user(username) for username in ("author", "reader", "other")
+        )
+
+    def get_feed(self):
+        return set(Recipe.objects.feed(self.reader, fanout_limit=1))
+
+    def test_recipes_survive_dropping_below_threshold(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        fanned_out = create_recipe(self.author, "Разосланный")
+        Follow.objects.create(user=self.other, author=self.author)
+        pulled = create_recipe(self.author, "Выбранный при чтении")
+        self.assertFalse(
+            TimelineEntry.objects.filter(recipe=pulled).exists()
+        )
+        self.assertEqual(self.get_feed(), {fanned_out, pulled})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.get(user=self.other).delete()
+
+        self.assertEqual(self.get_feed(), {fanned_out, pulled})
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.other).exists()
+        )
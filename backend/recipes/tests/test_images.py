@@ -0,0 +1,213 @@
+import hashlib
+import shutil
+import struct
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image, PngImagePlugin
+
+from .utils import create_recipe, create_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+ORIENTATION = 0x0112
+GPS_INFO = 0x8825
+XMP_NAMESPACE = b"http://ns.adobe.com/xap/1.0/"
+XMP = '<x:xmpmeta xmlns:x="adobe:ns:meta/"><gps>55.75</gps></x:xmpmeta>'
+
+
+def make_exif(orientation=6):
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    exif[GPS_INFO] = {1: "N", 2: (55.0, 45.0, 0.0)}
+    return exif
+
+
+def add_jpeg_xmp(content):
+    payload = XMP_NAMESPACE + b"\x00" + XMP.encode()
+    segment = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+    return content[:2] + segment + content[2:]
+
+
+def make_image(image_format, exif=None, color="red"):
+    image = Image.new("RGB", (40, 20), color)
+    image.putpixel((0, 0), (0, 0, 255))
+    buffer = BytesIO()
+    options = {}
+    if exif is not None:
+        options["exif"] = exif
+        if image_format == "PNG":
+            info = PngImagePlugin.PngInfo()
+            info.add_itxt("XML:com.adobe.xmp", XMP)
+            options["pnginfo"] = info
+        elif image_format == "WEBP":
+            options["xmp"] = XMP
+    image.save(buffer, image_format, **options)
+    if exif is not None and image_format == "JPEG":
+        return add_jpeg_xmp(buffer.getvalue())
+    return buffer.getvalue()
+
+
+def get_pixels(content):
+    with Image.open(BytesIO(content)) as image:
+        return image.size, image.tobytes()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageMetadataTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def store(self, content, name):
+        recipe = create_recipe(
+            self.author, name, image=ContentFile(content, name=name)
+        )
+        with recipe.image.open("rb") as file:
+            return file.read()
+
+    def test_metadata_is_stripped_without_reencoding(self):
+        formats = (("JPEG", "a.jpg"), ("PNG", "a.png"), ("WEBP", "a.webp"))
+        for image_format, name in formats:
+            with self.subTest(image_format=image_format):
+                original = make_image(image_format, make_exif())
+                stored = self.store(original, name)
+
+                self.assertNotIn(b"55.75", stored)
+                self.assertNotIn(b"xmp", stored.lower())
+                with Image.open(BytesIO(stored)) as image:
+                    self.assertEqual(image.format, image_format)
+                    # Из EXIF остаётся только ориентация.
+                    self.assertEqual(
+                        dict(image.getexif()), {ORIENTATION: 6}
+                    )
+                self.assertEqual(get_pixels(stored), get_pixels(original))
+
+    def test_default_orientation_is_dropped(self):
+        stored = self.store(make_image("JPEG", make_exif(1)), "b.jpg")
+        with Image.open(BytesIO(stored)) as image:
+            self.assertEqual(dict(image.getexif()), {})
+
+    def test_image_without_metadata_is_kept(self):
+        for image_format, name in (("PNG", "c.png"), ("JPEG", "c.jpg")):
+            with self.subTest(image_format=image_format):
+                content = make_image(image_format)
+                self.assertEqual(self.store(content, name), content)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_SYNC=True)
+class RecipeImageStorageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(
+                self.author, name, image=ContentFile(content, name="a.png")
+            )
+        recipe.refresh_from_db()
+        return recipe
+
+    def delete(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+
+    def get_files(self, recipe):
+        names = [recipe.image.name]
+        for key, thumbnails in recipe.thumbnails.items():
+            if key != "source":
+                names.extend(thumbnails.values())
+        return names
+
+    def assert_files_exist(self, names, exist=True):
+        for name in names:
+            with self.subTest(name=name):
+                self.assertEqual(default_storage.exists(name), exist)
+
+    def test_identical_images_share_file(self):
+        content = make_image("PNG", color="green")
+        first = self.create("Первый", content)
+        second = self.create("Второй", content)
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first.image.name, f"recipes/images/{digest}.png")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.thumbnails, first.thumbnails)
+        self.assertIn(
+            f"{digest}.png",
+            default_storage.listdir("recipes/images")[1],
+        )
+        with first.image.open("rb") as file:
+            self.assertEqual(file.read(), content)
+
+    @override_settings(MEDIA_ORPHAN_GRACE=0)
+    def test_shared_file_is_kept_while_referenced(self):
+        content = make_image("PNG", color="blue")
+        first = self.create("Первый", content)
+        second = self.create("Второй", content)
+        files = self.get_files(first)
+        self.assertGreater(len(files), 1)
+
+        self.delete(first)
+        self.assert_files_exist(files)
+
+        self.delete(second)
+        self.assert_files_exist(files, exist=False)
+
+    @override_settings(MEDIA_ORPHAN_GRACE=0)
+    def test_replaced_image_is_released(self):
+        recipe = self.create("Рецепт", make_image("PNG", color="white"))
+        files = self.get_files(recipe)
+
+        recipe.image = ContentFile(
+            make_image("PNG", color="black"), name="b.png"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assert_files_exist(files, exist=False)
+        self.assertTrue(default_storage.exists(recipe.image.name))
+
+    def test_recent_file_is_not_released(self):
+        recipe = self.create("Рецепт", make_image("PNG", color="yellow"))
+        files = self.get_files(recipe)
+
+        self.delete(recipe)
+        self.assert_files_exist(files)
+
+        call_command("cleanup_media", stdout=StringIO())
+        self.assert_files_exist(files)
+
+        with override_settings(MEDIA_ORPHAN_GRACE=0):
+            call_command("cleanup_media", stdout=StringIO())
+        self.assert_files_exist(files, exist=False)
+
+    @override_settings(MEDIA_ORPHAN_GRACE=0)
+    def test_cleanup_keeps_referenced_files(self):
+        recipe = self.create("Рецепт", make_image("PNG", color="gray"))
+        orphan = default_storage.save(
+            "recipes/images/orphan.png", ContentFile(b"orphan")
+        )
+
+        stdout = StringIO()
+        call_command("cleanup_media", "--dry-run", stdout=stdout)
+        self.assertIn(orphan, stdout.getvalue())
+        self.assertTrue(default_storage.exists(orphan))
+
+        call_command("cleanup_media", stdout=StringIO())
+        self.assertFalse(default_storage.exists(orphan))
+        self.assert_files_exist(self.get_files(recipe))
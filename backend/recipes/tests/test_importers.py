@@ -0,0 +1,141 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from recipes.exporters import export_recipes
+from recipes.importers import RecipeImporter
+from recipes.models import Follow, Ingredient, Recipe, RecipeIngredient, Tag
+
+from .utils import create_recipe, create_user
+
+
+def make_record(author, name):
+    return {
+        "author": author,
+        "name": name,
+        "image": "recipes/images/test.jpg",
+        "text": "Описание",
+        "cooking_time": 30,
+        "pub_date": "2022-01-01T10:00:00+00:00",
+        "tags": ["breakfast"],
+        "ingredients": [
+            {"name": "Свёкла", "measurement_unit": "г", "amount": 100}
+        ],
+    }
+
+
+class RecipeImportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name="Завтрак", slug="breakfast")
+        cls.ingredient = Ingredient.objects.create(
+            name="Свёкла", measurement_unit="г"
+        )
+        cls.authors = [create_user(name) for name in ("anna", "boris")]
+        cls.reader = create_user("reader")
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+        for author in cls.authors:
+            recipe = create_recipe(author, "Борщ")
+            recipe.tags.add(cls.tag)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=100
+            )
+
+    def import_records(self, records):
+        return RecipeImporter(warn=self.fail).import_batch(records)
+
+    def test_recipes_are_deduplicated_by_author_and_name(self):
+        records = [
+            make_record(author.username, name)
+            for author in self.authors
+            for name in ("Борщ", f"Салат {author.username}")
+        ]
+        # Одинаковые названия у разных авторов - разные рецепты.
+        self.assertEqual(self.import_records(records + records), 2)
+        self.assertEqual(Recipe.objects.count(), 4)
+        self.assertEqual(self.import_records(records), 0)
+
+        recipe = Recipe.objects.get(name="Салат anna")
+        self.assertEqual(recipe.pub_date.year, 2022)
+        self.assertEqual(list(recipe.tags.all()), [self.tag])
+        self.assertEqual(
+            list(recipe.ingredients.values_list("id", flat=True)),
+            [self.ingredient.id],
+        )
+
+    def test_export_round_trip_keeps_all_recipes(self):
+        records = list(export_recipes(chunk_size=1))
+        self.assertEqual(len(records), 2)
+        Recipe.objects.all().delete()
+
+        self.assertEqual(self.import_records(records), len(records))
+        self.assertEqual(list(export_recipes(chunk_size=1)), records)
+
+    def test_export_without_server_side_cursors(self):
+        records = list(export_recipes(chunk_size=1))
+        with mock.patch.dict(
+            connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True
+        ):
+            # По две части из одного рецепта (рецепт, теги, ингредиенты)
+            # и пустая последняя часть.
+            with self.assertNumQueries(7):
+                self.assertEqual(
+                    list(export_recipes(chunk_size=1)), records
+                )
+            with self.assertNumQueries(4):
+                self.assertEqual(
+                    list(export_recipes(chunk_size=10)), records
+                )
+
+    def test_imported_recipe_appears_in_feed(self):
+        with mock.patch(
+            "recipes.importers.image_processor.enqueue"
+        ) as enqueue:
+            self.import_records(
+                [make_record("anna", "Салат"), make_record("boris", "Суп")]
+            )
+
+        imported = Recipe.objects.get(name="Салат")
+        feed = Recipe.objects.feed(
+            self.reader, fanout_limit=settings.FEED_FANOUT_LIMIT
+        )
+        self.assertIn(imported, set(feed))
+        self.assertTrue(
+            self.reader.timeline.filter(recipe=imported).exists()
+        )
+        self.assertFalse(
+            self.reader.timeline.filter(recipe__name="Суп").exists()
+        )
+        self.assertEqual(
+            sorted(call.args[0] for call in enqueue.call_args_list),
+            sorted(
+                Recipe.objects.filter(
+                    name__in=("Салат", "Суп")
+                ).values_list("id", flat=True)
+            ),
+        )
+
+    def test_command_reports_skipped_records(self):
+        records = [
+            make_record(author.username, name)
+            for author in self.authors
+            for name in ("Борщ", "Салат")
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recipes.ndjson")
+            with open(path, "w", encoding="utf-8") as file:
+                for record in records:
+                    file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stdout = StringIO()
+            call_command("import_data", "recipes", path, stdout=stdout)
+
+        self.assertIn(
+            "записей: 4, добавлено: 2, пропущено: 2.", stdout.getvalue()
+        )
+        self.assertEqual(Recipe.objects.count(), 4)
@@ -0,0 +1,74 @@
+from django.contrib import admin
+from django.test import TestCase
+from recipes.admin import RecipeIngredientAdmin
+from recipes.models import Ingredient, RecipeIngredient, ShoppingListItem
+
+from .utils import create_recipe, create_user
+
+
+class ShoppingListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("user")
+        author = create_user("author")
+        cls.ingredient = Ingredient.objects.create(
+            name="Мука", measurement_unit="г"
+        )
+        cls.recipes = []
+        for amount in (100, 250):
+            recipe = create_recipe(author, f"Рецепт {amount}")
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=amount
+            )
+            cls.recipes.append(recipe)
+
+    def get_totals(self):
+        return list(
+            ShoppingListItem.objects.values_list(
+                "user_id", "ingredient_id", "total_amount"
+            )
+        )
+
+    def test_cart_changes_refresh_totals(self):
+        self.user.carts.add(*self.recipes)
+        self.assertEqual(
+            self.get_totals(), [(self.user.id, self.ingredient.id, 350)]
+        )
+
+        self.recipes[0].cart.remove(self.user)
+        self.assertEqual(
+            self.get_totals(), [(self.user.id, self.ingredient.id, 250)]
+        )
+
+        self.user.carts.clear()
+        self.assertEqual(self.get_totals(), [])
+
+    def test_repeated_refresh_keeps_single_row(self):
+        self.user.carts.add(*self.recipes)
+        for _ in range(2):
+            ShoppingListItem.objects.refresh(
+                [self.user.id], [self.ingredient.id]
+            )
+        self.assertEqual(
+            self.get_totals(), [(self.user.id, self.ingredient.id, 350)]
+        )
+
+    def test_admin_move_refreshes_both_recipes(self):
+        self.recipes[0].cart.add(self.user)
+        other = create_user("other")
+        self.recipes[1].cart.add(other)
+        item = RecipeIngredient.objects.get(recipe=self.recipes[0])
+        item.recipe = self.recipes[1]
+        item.ingredient = Ingredient.objects.create(
+            name="Сахар", measurement_unit="г"
+        )
+        RecipeIngredientAdmin(RecipeIngredient, admin.site).save_model(
+            None, item, None, change=True
+        )
+        self.assertEqual(
+            sorted(self.get_totals()),
+            [
+                (other.id, self.ingredient.id, 250),
+                (other.id, item.ingredient_id, 100),
+            ],
+        )
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from recipes.models import RecipeActivity, RecipeTrend
+
+from .utils import create_recipe, create_user
+
+
+class RecipeTrendTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("user")
+        author = create_user("author")
+        cls.recent = create_recipe(author, "Новый рецепт")
+        cls.old = create_recipe(author, "Старый рецепт")
+
+    def recompute(self):
+        return RecipeTrend.objects.recompute(
+            weights={"favorite": 1.0, "cart": 2.0},
+            half_life=timedelta(days=1),
+            window=timedelta(days=14),
+        )
+
+    def test_old_activities_are_pruned(self):
+        self.recent.favorite.add(self.user)
+        self.recent.cart.add(self.user)
+        self.old.favorite.add(self.user)
+        RecipeActivity.objects.filter(recipe=self.old).update(
+            created_at=timezone.now() - timedelta(days=15)
+        )
+
+        self.assertEqual(self.recompute(), 2)
+
+        self.assertQuerysetEqual(
+            RecipeActivity.objects.values_list("recipe_id", flat=True),
+            [self.recent.id, self.recent.id],
+            ordered=False,
+        )
+        trend = RecipeTrend.objects.get()
+        self.assertEqual(trend.recipe_id, self.recent.id)
+        self.assertAlmostEqual(trend.score, 3.0, places=3)
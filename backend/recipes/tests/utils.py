@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com"
+    )
+
+
+def create_recipe(author, name, **fields):
+    fields.setdefault("image", "recipes/images/test.jpg")
+    return Recipe.objects.create(
+        author=author,
+        name=name,
+        text="Описание",
+        cooking_time=10,
+        **fields,
+    )
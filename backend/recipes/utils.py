@@ -0,0 +1,6 @@
+"""Вспомогательные функции приложения recipes."""
+
+
+def normalize(value):
+    """Приводит строку к виду, в котором она участвует в поиске."""
+    return value.strip().casefold().replace("ё", "е")